@@ -2,6 +2,19 @@
 from .api import (
     get_sortino,
     get_xirr,
+    get_cashflows,
+    get_streamed_cashflows,
+    get_xirr_many,
+    get_xirr_grouped,
+    get_rolling_xirr,
+    get_rolling_sip_returns,
+    get_twrr,
+    get_twrr_grouped,
+    get_xnpv,
+    get_modified_dietz,
+    get_modified_dietz_many,
+    get_incremental_xirr,
+    get_xirr_cache,
     get_sharpe,
     get_volatility,
     get_drawdown,
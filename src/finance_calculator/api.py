@@ -1,9 +1,22 @@
+import pathlib
+
 import pandas as pd
-from finance_calculator.calculators.portfolio_calculator import XIRR
+from finance_calculator.calculators.cashflows import Cashflows, CashflowsBuilder
+from finance_calculator.calculators.day_count import ACT_365F
+from finance_calculator.calculators.portfolio_calculator import (
+    XIRR,
+    BatchXIRR,
+    IncrementalXIRR,
+    RollingXIRR,
+    RollingSIP,
+    TWRR,
+)
 from finance_calculator.calculators.ratio_calculator import RatioCalculator
+from finance_calculator.calculators.solver_stats import BatchStats
+from finance_calculator.calculators.xirr_cache import XIRRCache
 
 
-def get_xirr(cashflows) -> int:
+def get_xirr(cashflows, dietz_guess=False, day_count=ACT_365F, cache=None, stats=None) -> int:
     """
     Returns Excel style xirr
     IRR: The internal rate of return is a metric used in financial analysis to estimate the
@@ -13,17 +26,481 @@ def get_xirr(cashflows) -> int:
     XIRR is used when the cash flow model does not exactly have annual periodic cash flows.
     (Investopedia)
 
+    cashflows can be a list of tuple of (date, amount), a dataframe with 'date' (or a date
+    index) and 'amount' columns, a pair of (dates, amounts) arrays or a ``Cashflows``
+    instance from ``get_cashflows``. Dataframes and arrays are read column-wise without
+    building per-row python objects.
+
+    With ``dietz_guess=True`` newton starts from the modified dietz return, which is
+    usually much closer to the xirr than the default guess.
+
+    ``day_count`` picks the convention turning dates into year fractions: 'act/365f' (the
+    default, as in Excel), 'act/360', 'act/act' or '30/360'.
+
+    A ``cache`` from ``get_xirr_cache`` answers ledgers it has seen before without
+    solving them again. A ``SolveStats`` passed as ``stats`` is filled with the
+    iterations, guesses, method, failure reasons and wall time of the solve.
+
     :param cashflows:
+    :param dietz_guess: bool
+    :param day_count: str
+    :param cache: XIRRCache
+    :param stats: SolveStats
     :return: int
     """
+    if isinstance(cashflows, list):
+        if not all(isinstance(item, tuple) for item in cashflows):
+            raise TypeError("expected a list of tuple of (date, amount)")
+        xirr = XIRR(cashflows, day_count=day_count)
+    else:
+        xirr = XIRR(get_cashflows(cashflows), day_count=day_count)
+    xirr.stats = stats
+
+    def solve():
+        if dietz_guess and not xirr.error and xirr.guess is None:
+            xirr.guess = XIRR.modified_dietz(xirr.year_fracs, xirr.amounts)
+        return xirr.get_xirr()
+
+    if cache is not None and not xirr.error:
+        return cache.get_xirr(xirr, solve, dietz_guess=dietz_guess)
+    return solve()
+
+
+def get_xnpv(cashflows, rates, day_count=ACT_365F):
+    """
+    Returns Excel style xnpv: the net present value of the cashflows, discounted from each
+    cashflow's date to the first date at the given annual rate. ``rates`` can be a single
+    rate or an array of rates (as fractions, 0.1 for 10%), all evaluated in one broadcasted
+    numpy operation over the precomputed year fractions.
+
+    >>> import finance_calculator as fc
+    >>> npv_grid = fc.get_xnpv(cashflow_data, numpy.linspace(-0.5, 0.5, 101))
+
+    :param cashflows: list of tuple of (date, amount), dataframe, (dates, amounts) or Cashflows
+    :param rates: float or array of floats
+    :param day_count: str, day count convention as in ``get_xirr``
+    :return: float, or numpy array shaped like rates
+    """
+    xirr = XIRR(
+        cashflows if isinstance(cashflows, list) else get_cashflows(cashflows),
+        day_count=day_count,
+    )
+    if xirr.error:
+        raise TypeError("expected a list of tuple of (date, amount)")
+    values = XIRR.xnpv(xirr.year_fracs, xirr.amounts, rates)
+    return float(values) if values.ndim == 0 else values
+
+
+def get_modified_dietz(cashflows, day_count=ACT_365F):
+    """
+    Returns the annualised modified dietz return in percent, a closed form approximation of
+    xirr. The last cashflow closes the period; every cashflow is weighted by the share of
+    the period it was invested for and the period return (gain / average capital) is
+    compounded to a year. None where it is not defined.
+
+    :param cashflows: list of tuple of (date, amount), dataframe, (dates, amounts) or Cashflows
+    :param day_count: str, day count convention as in ``get_xirr``
+    :return: float
+    """
+    xirr = XIRR(
+        cashflows if isinstance(cashflows, list) else get_cashflows(cashflows),
+        day_count=day_count,
+    )
+    if xirr.error:
+        return None
+    dietz = XIRR.modified_dietz(xirr.year_fracs, xirr.amounts)
+    return dietz * 100 if dietz is not None else None
+
+
+def get_modified_dietz_many(cashflow_sets, day_count=ACT_365F):
+    """
+    Returns the annualised modified dietz return (see ``get_modified_dietz``) of many
+    portfolios in percent, computed in one vectorized pass, nan where it is not defined.
+
+    :param cashflow_sets: list of lists of tuple of (date, amount), or of ``Cashflows``
+    :param day_count: str, day count convention as in ``get_xirr``
+    :return: numpy array
+    """
+    _verify_cashflow_sets(cashflow_sets)
+    batch = BatchXIRR.from_cashflow_sets(cashflow_sets, day_count=day_count)
+    return batch.get_modified_dietz() * 100
+
+
+def get_cashflows(cashflows):
+    """
+    Returns a compact ``Cashflows`` ledger: int32 day offsets from the first date and
+    float64 amounts. It can be passed to ``get_xirr`` and ``get_xirr_many`` in place of the
+    original data, and keeps millions of ledgers in memory at a fraction of the size of
+    lists of tuples::
+
+    >>> import finance_calculator as fc
+    >>> ledger = fc.get_cashflows(cashflow_data)
+    >>> xirr = fc.get_xirr(ledger)
+
+    An iterator of (date, amount) tuples, such as a generator, is read in chunks like
+    ``get_streamed_cashflows`` does.
+
+    :param cashflows: list of tuple of (date, amount), dataframe, (dates, amounts) pair or
+        iterator of tuple of (date, amount)
+    :return: Cashflows
+    """
+    if isinstance(cashflows, Cashflows):
+        return cashflows
+    if hasattr(cashflows, "__next__"):
+        return get_streamed_cashflows(cashflows)
     if isinstance(cashflows, pd.DataFrame):
-        pass
+        return Cashflows.from_dates(*_cashflow_columns(cashflows))
+    if isinstance(cashflows, tuple) and len(cashflows) == 2:
+        return Cashflows.from_dates(*cashflows)
     if isinstance(cashflows, list):
         if not all(isinstance(item, tuple) for item in cashflows):
             raise TypeError("expected a list of tuple of (date, amount)")
+        return Cashflows.from_transactions(cashflows)
+    raise TypeError("function called for unsupported data types.")
+
+
+def get_streamed_cashflows(
+    source, chunk_size=CashflowsBuilder.chunk_size, date_column="date", amount_column="amount"
+):
+    """
+    Returns a ``Cashflows`` ledger built from a source too large to hold as a list: an
+    iterable of (date, amount) tuples, or the path (or open file) of a csv with date and
+    amount columns. Rows are read ``chunk_size`` at a time and summed by day, so memory
+    is bounded by the number of distinct dates::
+
+    >>> import finance_calculator as fc
+    >>> ledger = fc.get_streamed_cashflows("ledger_export.csv", chunk_size=1000000)
+    >>> xirr = fc.get_xirr(ledger)
+
+    :param source: iterable of tuple of (date, amount), csv path or file object
+    :param chunk_size: int
+    :param date_column: str, csv column of the dates
+    :param amount_column: str, csv column of the amounts
+    :return: Cashflows
+    """
+    builder = CashflowsBuilder()
+    # os.PathLike is python 3.6 onwards, other path objects are told by their __fspath__
+    if (
+        isinstance(source, (str, pathlib.PurePath))
+        or hasattr(source, "__fspath__")
+        or hasattr(source, "read")
+    ):
+        for chunk in pd.read_csv(
+            source, usecols=[date_column, amount_column], chunksize=chunk_size
+        ):
+            builder.add(pd.to_datetime(chunk[date_column]).values, chunk[amount_column].values)
+        return builder.build()
+    return builder.add_rows(source, chunk_size).build()
+
+
+def _cashflow_columns(cashflow_df):
+    if "amount" not in cashflow_df.columns:
+        raise ValueError("cashflow dataframe must have 'amount' column")
+    if "date" in cashflow_df.columns:
+        dates = pd.to_datetime(cashflow_df["date"]).values
+    elif isinstance(cashflow_df.index, pd.DatetimeIndex):
+        dates = cashflow_df.index.values
     else:
+        raise ValueError("cashflow dataframe must have 'date' column or a date index")
+    return dates, cashflow_df["amount"].values
+
+
+def _solve_batch(batch, n_jobs, executor, dietz_guess, cache=None, stats=None):
+    if cache is not None:
+
+        def solve(missing_batch, missing):
+            missing_stats = BatchStats() if stats is not None else None
+            result = _solve_batch(missing_batch, n_jobs, executor, dietz_guess, stats=missing_stats)
+            if stats is not None:
+                stats.merge(missing_stats, portfolios=missing)
+            return result
+
+        return cache.get_xirr_batch(batch, solve, dietz_guess=dietz_guess)
+    if executor is None and n_jobs == 1:
+        return batch.get_xirr(dietz_guess=dietz_guess, stats=stats)
+    return batch.get_xirr_parallel(
+        n_jobs=n_jobs, executor=executor, dietz_guess=dietz_guess, stats=stats
+    )
+
+
+def _verify_cashflow_sets(cashflow_sets):
+    if not isinstance(cashflow_sets, (list, tuple)):
         raise TypeError("function called for unsupported data types.")
-    return XIRR(cashflows).get_xirr()
+    for cashflows in cashflow_sets:
+        if isinstance(cashflows, Cashflows):
+            continue
+        if not isinstance(cashflows, list) or not all(
+            isinstance(item, tuple) for item in cashflows
+        ):
+            raise TypeError("expected a list of lists of tuple of (date, amount)")
+
+
+def get_xirr_many(
+    cashflow_sets,
+    n_jobs=1,
+    executor=None,
+    dietz_guess=False,
+    day_count=ACT_365F,
+    cache=None,
+    stats=None,
+):
+    """
+    Returns Excel style xirr for many portfolios in one call. All cashflows are packed into
+    flat arrays and newton's method runs on every portfolio at once; only the portfolios it
+    can not converge are retried one by one like ``get_xirr``.
+
+    status is ``BatchXIRR.CONVERGED`` (0) when the batched solve converged,
+    ``BatchXIRR.FALLBACK`` (1) when the single portfolio retry found the xirr and
+    ``BatchXIRR.FAILED`` (2) when no xirr was found, in which case the rate is nan.
+
+    With ``n_jobs`` other than 1 (``None`` or -1 for all cpus), or an ``executor`` such as a
+    ``concurrent.futures.ProcessPoolExecutor``, the portfolios are sharded across worker
+    processes which read the packed cashflows from shared memory. ``dietz_guess=True``
+    starts every portfolio from its modified dietz return. With a ``cache`` from
+    ``get_xirr_cache`` only the portfolios it has not seen are solved. A ``BatchStats``
+    passed as ``stats`` collects counters of the portfolios solved (cache hits are not
+    solved and not counted), with a ``SolveStats`` for every portfolio that fell back.
+
+    :param cashflow_sets: list of lists of tuple of (date, amount), or of ``Cashflows``
+    :param n_jobs: int
+    :param executor: concurrent.futures.Executor
+    :param dietz_guess: bool
+    :param day_count: str, day count convention as in ``get_xirr``
+    :param cache: XIRRCache
+    :param stats: BatchStats
+    :return: (numpy array of rates, numpy array of status)
+    """
+    _verify_cashflow_sets(cashflow_sets)
+    batch = BatchXIRR.from_cashflow_sets(cashflow_sets, day_count=day_count)
+    return _solve_batch(batch, n_jobs, executor, dietz_guess, cache, stats)
+
+
+def get_xirr_grouped(
+    cashflow_df,
+    by="folio_id",
+    n_jobs=1,
+    executor=None,
+    dietz_guess=False,
+    day_count=ACT_365F,
+    cache=None,
+    stats=None,
+):
+    """
+    Returns Excel style xirr of every group in a long format transactions dataframe, with
+    the group column given by ``by`` and 'date' and 'amount' columns. The frame is sorted
+    once, split at the group boundaries and all groups are solved together like
+    ``get_xirr_many``, including its ``n_jobs``, ``executor``, ``dietz_guess``,
+    ``day_count``, ``cache`` and ``stats`` options. Portfolio indices in ``stats`` are
+    positions in the returned series.
+
+    :param cashflow_df: pandas dataframe
+    :param by: str
+    :param n_jobs: int
+    :param executor: concurrent.futures.Executor
+    :param dietz_guess: bool
+    :param day_count: str
+    :param cache: XIRRCache
+    :param stats: BatchStats
+    :return: pandas series of xirr indexed by group key, nan where no xirr was found
+    """
+    if not isinstance(cashflow_df, pd.DataFrame):
+        raise TypeError("function called for unsupported data types.")
+    if by not in cashflow_df.columns:
+        raise ValueError("cashflow dataframe must have '{}' column".format(by))
+    dates, amounts = _cashflow_columns(cashflow_df)
+    codes, keys = pd.factorize(cashflow_df[by], sort=True)
+    grouped = codes >= 0
+    batch = BatchXIRR.from_grouped_arrays(
+        codes[grouped], dates[grouped], amounts[grouped], count=len(keys), day_count=day_count
+    )
+    rates, _ = _solve_batch(batch, n_jobs, executor, dietz_guess, cache, stats)
+    return pd.Series(rates, index=pd.Index(keys, name=by), name="xirr")
+
+
+def get_rolling_xirr(cashflows, nav_data, day_count=ACT_365F):
+    """
+    Returns the xirr of a cashflow ledger as of every date in the nav data, with the units
+    bought by each cashflow (amount / nav) valued at that day's nav. The as-of dates are
+    solved in vectorized blocks, each one warm started from the previous block's rate.
+
+    :param cashflows: list of tuple of (date, amount), dataframe, (dates, amounts) or Cashflows
+    :param nav_data: list of tuple of (date, nav) or dataframe
+    :param day_count: str, day count convention as in ``get_xirr``
+    :return: pandas series of xirr indexed by date
+    """
+    ledger = get_cashflows(cashflows)
+    if not len(ledger):
+        raise ValueError("cashflows must not be empty")
+    nav_dataframe = _transform_df(nav_data).sort_index()
+    asof_dates, xirr = RollingXIRR(
+        ledger, nav_dataframe.index.values, nav_dataframe["nav"].values, day_count=day_count
+    ).get_xirr()
+    return pd.Series(xirr, index=pd.DatetimeIndex(asof_dates, name="date"), name="xirr")
+
+
+def get_rolling_sip_returns(
+    nav_data, amount=1000, frequency="monthly", tenure=3, day_count=ACT_365F
+):
+    """
+    Returns the xirr of a systematic investment plan (SIP) started on every date of the nav
+    data: ``amount`` invested every period of ``frequency`` ('daily', 'weekly', 'monthly'
+    or 'quarterly') for ``tenure`` years, each installment buying units at that day's nav
+    (or the last one before it), and the units valued one period after the last
+    installment. Every start date whose plan ends within the nav data is solved, all in
+    vectorized batches::
+
+    >>> import finance_calculator as fc
+    >>> sip_returns = fc.get_rolling_sip_returns(scheme_data, 5000, "monthly", tenure=5)
+    >>> sip_returns.describe()
+
+    :param nav_data: list of tuple of (date, nav) or dataframe
+    :param amount: float
+    :param frequency: str
+    :param tenure: float, in years
+    :param day_count: str, day count convention as in ``get_xirr``
+    :return: pandas series of xirr indexed by start date
+    """
+    nav_dataframe = _transform_df(nav_data)
+    if nav_dataframe is None:
+        raise ValueError("nav data must not be empty")
+    nav_dataframe = nav_dataframe.sort_index()
+    starts, xirr = RollingSIP.from_tenure(
+        nav_dataframe.index.values,
+        nav_dataframe["nav"].values,
+        amount,
+        frequency,
+        tenure,
+        day_count=day_count,
+    ).get_xirr()
+    return pd.Series(xirr, index=pd.DatetimeIndex(starts, name="date"), name="xirr")
+
+
+def _valuation_columns(valuation_data):
+    if isinstance(valuation_data, list):
+        if not all(isinstance(item, tuple) for item in valuation_data):
+            raise TypeError("expected a list of tuple of (date, value)")
+        valuation_data = pd.DataFrame(valuation_data, columns=["date", "value"])
+    if not isinstance(valuation_data, pd.DataFrame):
+        raise TypeError("function called for unsupported data types.")
+    if "value" not in valuation_data.columns:
+        raise ValueError("valuation dataframe must have 'value' column")
+    if "date" in valuation_data.columns:
+        dates = pd.to_datetime(valuation_data["date"]).values
+    elif isinstance(valuation_data.index, pd.DatetimeIndex):
+        dates = valuation_data.index.values
+    else:
+        raise ValueError("valuation dataframe must have 'date' column or a date index")
+    return dates, valuation_data["value"].values
+
+
+def get_twrr(cashflows, valuation_data, tail=True):
+    """
+    Returns the time weighted rate of return (in percent). The time-weighted rate of return
+    (TWR) is a measure of the compound rate of growth in a portfolio. It eliminates the
+    distorting effects on growth rates created by inflows and outflows of money.
+    (Investopedia)
+
+    valuation_data holds the portfolio value at the close of each date, after that day's
+    cashflows, as a list of tuple of (date, value) or a dataframe with 'date' (or a date
+    index) and 'value' columns. Cashflows are taken to happen at the close of the first
+    valuation date on or after them.
+
+    :param cashflows: list of tuple of (date, amount), dataframe, (dates, amounts) or Cashflows
+    :param valuation_data:
+    :param tail: bool
+    :return: float, or a pandas series of cumulative twrr indexed by date with tail=False
+    """
+    ledger = get_cashflows(cashflows)
+    dates, values = _valuation_columns(valuation_data)
+    twrr = TWRR.from_ledger(ledger, dates, values)
+    cumulative = twrr.get_twrr()
+    if tail:
+        return float(cumulative[-1]) if len(cumulative) else None
+    return pd.Series(
+        cumulative, index=pd.DatetimeIndex(twrr.valuation_dates, name="date"), name="twrr"
+    )
+
+
+def get_twrr_grouped(cashflow_df, valuation_df, by="folio_id"):
+    """
+    Returns the time weighted return (in percent) of every group of a long format
+    transactions dataframe ('date' and 'amount' columns), valued by a long format
+    valuation dataframe ('date' and 'value' columns) sharing the ``by`` column. All groups
+    are chained in one vectorized pass.
+
+    :param cashflow_df: pandas dataframe
+    :param valuation_df: pandas dataframe
+    :param by: str
+    :return: pandas series of twrr indexed by group key
+    """
+    if not isinstance(cashflow_df, pd.DataFrame) or not isinstance(valuation_df, pd.DataFrame):
+        raise TypeError("function called for unsupported data types.")
+    for df in (cashflow_df, valuation_df):
+        if by not in df.columns:
+            raise ValueError("dataframes must have '{}' column".format(by))
+    dates, amounts = _cashflow_columns(cashflow_df)
+    valuation_dates, values = _valuation_columns(valuation_df)
+    codes, keys = pd.factorize(
+        pd.concat([cashflow_df[by], valuation_df[by]], ignore_index=True), sort=True
+    )
+    codes, valuation_codes = codes[:len(cashflow_df)], codes[len(cashflow_df):]
+    grouped, valued = codes >= 0, valuation_codes >= 0
+    total = TWRR(
+        codes[grouped],
+        dates[grouped],
+        amounts[grouped],
+        valuation_codes[valued],
+        valuation_dates[valued],
+        values[valued],
+        len(keys),
+    ).get_total_twrr()
+    return pd.Series(total, index=pd.Index(keys, name=by), name="twrr")
+
+
+def get_incremental_xirr(cashflows=None, guess=None, day_count=ACT_365F):
+    """
+    returns an incremental xirr instance for an append-only ledger::
+
+    >>> import finance_calculator as fc
+    >>> ledger = fc.get_incremental_xirr(cashflow_data)
+    >>> xirr = ledger.xirr
+    >>> xirr = ledger.append(datetime.date(2020, 9, 1), 10000)
+
+    every append re-solves from the previous xirr instead of a cold start, so a new
+    installment or redemption usually costs one or two newton steps.
+
+    :param cashflows: list of tuple of (date, amount)
+    :param guess: float
+    :param day_count: str, day count convention as in ``get_xirr``
+    :return: IncrementalXIRR
+    """
+    if cashflows is not None:
+        if not isinstance(cashflows, list) or not all(
+            isinstance(item, tuple) for item in cashflows
+        ):
+            raise TypeError("expected a list of tuple of (date, amount)")
+    return IncrementalXIRR(cashflows, guess=guess, day_count=day_count)
+
+
+def get_xirr_cache(maxsize=100000, path=None):
+    """
+    returns a result cache to pass as ``cache`` to ``get_xirr``, ``get_xirr_many`` and
+    ``get_xirr_grouped``::
+
+    >>> import finance_calculator as fc
+    >>> cache = fc.get_xirr_cache(path="xirr_cache.sqlite")
+    >>> rates, status = fc.get_xirr_many(cashflow_sets, cache=cache)
+    >>> cache.hit_rate
+
+    ledgers are keyed by a hash of their cashflows and the solver settings. The last
+    ``maxsize`` results are kept in memory, and with a ``path`` every result is also kept in
+    an sqlite file, so unchanged ledgers are not solved again by the next run.
+
+    :param maxsize: int
+    :param path: str
+    :return: XIRRCache
+    """
+    return XIRRCache(maxsize=maxsize, path=path)
 
 
 def _verify_nav_df(nav_dataframe):
@@ -37,13 +514,15 @@ def _verify_nav_df(nav_dataframe):
 
 
 def _transform_df(nav_data):
-    if not nav_data:
+    if nav_data is None:
         return None
     if not isinstance(nav_data, pd.DataFrame):
+        if not nav_data:
+            return None
         nav_data = _convert_data_to_df(nav_data)
     if "date" in nav_data.columns:
-        nav_data["date"] = pd.to_datetime(nav_data["date"])
-    nav_data.set_index("date", inplace=True)
+        # a new frame, the caller's data is not written to
+        nav_data = nav_data.assign(date=pd.to_datetime(nav_data["date"])).set_index("date")
     _verify_nav_df(nav_data)
     return nav_data
 
@@ -343,7 +822,7 @@ def get_downside_capture(
 
 
 def get_ratio_calculator(
-    nav_data, benchmark_nav_data=None, risk_free_rate=None, annualiser=250
+    nav_data, benchmark_nav_data=None, risk_free_rate=None, annualiser=250, cache_size=64
 ):
     """
     returns a ratio calculator instance which can be used to call functions as below::
@@ -356,10 +835,14 @@ def get_ratio_calculator(
     benefit is that the data pre processing would not happen multiple time if you have to get
     multiple ratios on the same data-set. You need to pass window value separately for each function
 
+    results are cached per ratio and window: the last ``cache_size`` of them are kept, and
+    ``rc.cache_hits`` and ``rc.cache_misses`` count the lookups.
+
     :param nav_data:
     :param benchmark_nav_data:
     :param risk_free_rate: float
     :param annualiser: int
+    :param cache_size: int
     :return:
     """
     nav_dataframe = _transform_df(nav_data)
@@ -369,5 +852,6 @@ def get_ratio_calculator(
         benchmark_nav_dataframe=benchmark_nav_dataframe,
         risk_free_rate=risk_free_rate,
         annualiser=annualiser,
+        cache_size=cache_size,
     )
     return ratio_calculator
@@ -0,0 +1,175 @@
+import itertools
+
+import numpy as np
+
+from finance_calculator.calculators.day_count import ACT_365F, act_365f, get_day_count, year_fractions
+
+
+def merge_same_day(year_fracs, amounts, segments=None):
+    """
+    collapses sorted cashflows falling on the same day (and in the same segment, for packed
+    portfolios) into a single flow with the summed amount. The npv is unchanged, every
+    solver iteration just has fewer terms to evaluate.
+    """
+    if len(year_fracs) < 2:
+        return year_fracs, amounts, segments
+    starts = np.empty(len(year_fracs), dtype=bool)
+    starts[0] = True
+    np.not_equal(year_fracs[1:], year_fracs[:-1], out=starts[1:])
+    if segments is not None:
+        starts[1:] |= segments[1:] != segments[:-1]
+    if starts.all():
+        return year_fracs, amounts, segments
+    starts = np.flatnonzero(starts)
+    amounts = np.add.reduceat(amounts, starts)
+    segments = segments[starts] if segments is not None else None
+    return year_fracs[starts], amounts, segments
+
+
+def pack_by_group(codes, dates, amounts, count=None):
+    """
+    sorts long format rows by (code, date), larger amounts first within a day, where
+    ``codes[i]`` in ``0..count - 1`` is the group of row ``i``. returns the sorted codes,
+    dates (datetime64[D]) and amounts with ``offsets[i]:offsets[i + 1]`` marking group i.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    dates = np.asarray(dates).astype("datetime64[D]")
+    amounts = np.asarray(amounts, dtype=np.float64)
+    if count is None:
+        count = int(codes.max()) + 1 if len(codes) else 0
+    order = np.lexsort((-amounts, dates, codes))
+    codes, dates, amounts = codes[order], dates[order], amounts[order]
+    offsets = np.searchsorted(codes, np.arange(count + 1))
+    return codes, dates, amounts, offsets
+
+
+class Cashflows:
+    """
+    Compact cashflow ledger: int32 day offsets from the first date and float64 amounts,
+    about 12 bytes per cashflow instead of a python tuple of a date and a number.
+    ``presorted`` records whether the offsets are already in order, so sorting happens at
+    most once however many times the ledger is solved.
+    """
+
+    __slots__ = ("start", "days", "amounts", "presorted")
+
+    def __init__(self, start, days, amounts, presorted=False):
+        self.start = None if start is None else np.datetime64(start, "D")
+        self.days = np.asarray(days, dtype=np.int32)
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.presorted = presorted
+        if self.days.shape != self.amounts.shape or self.days.ndim != 1:
+            raise ValueError("days and amounts must be one dimensional and of equal length")
+
+    @classmethod
+    def from_dates(cls, dates, amounts):
+        """
+        :param dates: array of datetime64 or date objects
+        :param amounts: array of numbers
+        """
+        dates = np.asarray(dates).astype("datetime64[D]")
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if dates.shape != amounts.shape or dates.ndim != 1:
+            raise ValueError("dates and amounts must be one dimensional and of equal length")
+        if not len(dates):
+            return cls(None, [], [], presorted=True)
+        start = dates.min()
+        days = (dates - start).astype(np.int32)
+        return cls(start, days, amounts, presorted=bool(np.all(days[1:] >= days[:-1])))
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        :param transactions: list of tuple of (date, amount)
+        """
+        return cls.from_dates(
+            [t[0] for t in transactions], [t[1] for t in transactions]
+        )
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def dates(self):
+        return self.start + self.days.astype("timedelta64[D]")
+
+    @property
+    def year_fracs(self):
+        return self.days / 365
+
+    def year_fractions(self, day_count=ACT_365F):
+        """
+        :param day_count: day count convention, see ``day_count.get_day_count``
+        :return: float64 array of year fractions from the first date
+        """
+        if get_day_count(day_count) is act_365f:
+            return self.year_fracs
+        if not len(self):
+            return np.empty(0)
+        return year_fractions(self.dates, self.start, day_count)
+
+    def sorted(self):
+        """
+        returns the ledger ordered by day, larger amounts first within a day, the same
+        order ``XIRR`` solves in. A presorted ledger is returned as it is.
+        """
+        if self.presorted:
+            return self
+        order = np.lexsort((-self.amounts, self.days))
+        return Cashflows(self.start, self.days[order], self.amounts[order], presorted=True)
+
+
+class CashflowsBuilder:
+    """
+    Builds a ``Cashflows`` ledger from rows arriving in chunks. Every chunk is summed by
+    day into the running per-day totals, so memory grows with the number of distinct dates
+    and the size of one chunk, not with the number of rows. Same day flows are merged by
+    every solver anyway, so the xirr of the built ledger is the xirr of all the rows.
+    """
+
+    chunk_size = 65536
+
+    def __init__(self):
+        # days since 1970-01-01, sorted and unique, and the amount summed on each
+        self.days = np.empty(0, dtype=np.int64)
+        self.amounts = np.empty(0, dtype=np.float64)
+        self.rows = 0
+
+    def __len__(self):
+        return len(self.days)
+
+    def add(self, dates, amounts):
+        """
+        :param dates: array of datetime64 or date objects
+        :param amounts: array of numbers
+        """
+        days = np.asarray(dates).astype("datetime64[D]").astype(np.int64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if days.shape != amounts.shape or days.ndim != 1:
+            raise ValueError("dates and amounts must be one dimensional and of equal length")
+        self.rows += len(days)
+        self.days, inverse = np.unique(np.concatenate((self.days, days)), return_inverse=True)
+        self.amounts = np.bincount(
+            inverse.ravel(), np.concatenate((self.amounts, amounts)), minlength=len(self.days)
+        )
+        return self
+
+    def add_rows(self, rows, chunk_size=None):
+        """
+        :param rows: iterable of tuple of (date, amount), read ``chunk_size`` rows at a time
+        """
+        rows = iter(rows)
+        chunk_size = chunk_size or self.chunk_size
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return self
+            self.add([t[0] for t in chunk], [t[1] for t in chunk])
+
+    def build(self):
+        if not len(self.days):
+            return Cashflows(None, [], [], presorted=True)
+        start = self.days[0]
+        return Cashflows(
+            np.datetime64(int(start), "D"), self.days - start, self.amounts, presorted=True
+        )
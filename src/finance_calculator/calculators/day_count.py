@@ -0,0 +1,110 @@
+"""
+Day count conventions, turning dates into year fractions from a start date. Every
+convention works on whole datetime64[D] arrays (``start`` may be a single date or an array
+of the same length), so the fractions are computed once before any solver iterates.
+"""
+import numpy as np
+
+ACT_365F = "act/365f"
+ACT_360 = "act/360"
+ACT_ACT = "act/act"
+THIRTY_360 = "30/360"
+
+
+def act_365f(dates, start):
+    """actual days over a fixed 365 day year, what Excel's XIRR and XNPV use"""
+    return (dates - start).astype(np.int64) / 365
+
+
+def act_360(dates, start):
+    """actual days over a 360 day year"""
+    return (dates - start).astype(np.int64) / 360
+
+
+def act_act(dates, start):
+    """
+    actual/actual (ISDA): days falling in a leap year count 1/366 of a year, the others
+    1/365.
+    """
+
+    def position(values):
+        years = values.astype("datetime64[Y]")
+        year_start = years.astype("datetime64[D]")
+        next_start = (years + np.timedelta64(1, "Y")).astype("datetime64[D]")
+        year_length = (next_start - year_start).astype(np.int64)
+        elapsed = (values - year_start).astype(np.int64)
+        return years.astype(np.int64) + elapsed / year_length
+
+    return position(dates) - position(start)
+
+
+def thirty_360(dates, start):
+    """
+    30/360 bond basis: every month counts 30 days. A start on the 31st moves to the 30th,
+    and an end on the 31st does too when the start is on the 30th or 31st.
+    """
+    start_year, start_month, start_day = _year_month_day(start)
+    year, month, day = _year_month_day(dates)
+    start_day = np.minimum(start_day, 30)
+    day = np.where((day == 31) & (start_day == 30), 30, day)
+    return (360 * (year - start_year) + 30 * (month - start_month) + (day - start_day)) / 360
+
+
+def _year_month_day(values):
+    years = values.astype("datetime64[Y]")
+    months = values.astype("datetime64[M]")
+    return (
+        years.astype(np.int64),
+        (months - years.astype("datetime64[M]")).astype(np.int64) + 1,
+        (values - months.astype("datetime64[D]")).astype(np.int64) + 1,
+    )
+
+
+DAY_COUNTS = {
+    ACT_365F: act_365f,
+    ACT_360: act_360,
+    ACT_ACT: act_act,
+    THIRTY_360: thirty_360,
+}
+
+_ALIASES = {
+    "act/365": ACT_365F,
+    "actual/365": ACT_365F,
+    "actual/365f": ACT_365F,
+    "actual/365fixed": ACT_365F,
+    "actual/360": ACT_360,
+    "actual/actual": ACT_ACT,
+    "act/actisda": ACT_ACT,
+    "actual/actualisda": ACT_ACT,
+    "30/360bond": THIRTY_360,
+}
+
+
+def get_day_count(convention):
+    """
+    :param convention: one of 'act/365f', 'act/360', 'act/act', '30/360' (case and spaces
+        are ignored, common spellings like 'actual/365' are accepted)
+    :return: function of (dates, start) returning year fractions
+    """
+    key = str(convention).lower().replace(" ", "").replace("-", "")
+    key = _ALIASES.get(key, key)
+    if key not in DAY_COUNTS:
+        raise ValueError("unknown day count convention '{}'".format(convention))
+    return DAY_COUNTS[key]
+
+
+def year_fractions(dates, start=None, convention=ACT_365F):
+    """
+    :param dates: array of datetime64 or date objects
+    :param start: date or array of dates, the earliest date when not given
+    :param convention: str
+    :return: float64 array of year fractions from start to each date
+    """
+    day_count = get_day_count(convention)
+    dates = np.asarray(dates).astype("datetime64[D]")
+    if start is None:
+        if not len(dates):
+            return np.empty(0)
+        start = dates.min()
+    start = np.asarray(start).astype("datetime64[D]")
+    return day_count(dates, start)
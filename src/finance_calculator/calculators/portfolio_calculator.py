@@ -1,35 +1,22 @@
-# # import scipy.optimize
-# from datetime import date
-
-
-# def xnpv(rate, cashflows):
-#     """
-#     Equivalent of Excel's XNPV function.
-#     >>> from datetime import date
-#     >>> dates = [date(2010, 12, 29), date(2012, 1, 25), date(2012, 3, 8)]
-#     >>> values = [-10000, 20, 10100]
-#     >>> xnpv(0.1, values, dates)
-#     -966.4345...
-#     """
-#     if rate <= -1.0:
-#         return float('inf')
-#     d0 = cashflows[0][0]    # or min(dates)
-#     return sum([c[1] / (1.0 + rate)**((c[0] - d0).days / 365.0) for c in cashflows])
-#
-#
-# def xirr(cashflows):
-#     """
-#     Equivalent of Excel's XIRR function.
-#     >>> from datetime import date
-#     >>> dates = [date(2010, 12, 29), date(2012, 1, 25), date(2012, 3, 8)]
-#     >>> values = [-10000, 20, 10100]
-#     >>> xirr(values, dates)
-#     0.0100612...
-#     """
-#     try:
-#         return scipy.optimize.newton(lambda r: xnpv(r, cashflows), 0.0)
-#     except RuntimeError:    # Failed to converge?
-#         return scipy.optimize.brentq(lambda r: xnpv(r, cashflows), -1.0, 1e10)
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python < 3.8: every worker is sent the arrays of its shard instead
+    shared_memory = None
+
+from finance_calculator.calculators.cashflows import (
+    Cashflows,
+    merge_same_day,
+    pack_by_group,
+)
+from finance_calculator.calculators.day_count import ACT_365F, year_fractions
+from finance_calculator.calculators.solver_stats import BatchStats, SolveStats
 
 
 # noinspection PyBroadException
@@ -39,123 +26,1073 @@ class XIRR:
     # Set maximum epsilon for end of iteration
     eps_max_rate = 1e-6
     eps_max_value = 1e-4
-    guess_vals_neg = [-0.1, -0.05, -0.025, -0.15, -0.2, -0.25, -0.3, -0.5, -0.75, -0.9]
 
     # Set maximum epsilon for end of iteration
     iter_max = 100
 
-    def __init__(self, transactions, guess=None):
+    # rates newton restarts from when it fails from the guess, as the solver always did;
+    # the positive ones when the default guess is positive
+    guess_vals_neg = (-0.1, -0.05, -0.025, -0.15, -0.2, -0.25, -0.3, -0.5, -0.75, -0.9)
+
+    # rates scanned for a sign change of the npv when no restart converges
+    bracket_rates = (
+        -0.99, -0.9, -0.75, -0.5, -0.3, -0.2, -0.1, 0.0, 0.1,
+        0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0, 10.0, 100.0, 1e3, 1e6, 1e9,
+    )
+    bracket_iter_max = 100
+
+    # equally spaced ledgers of up to this many steps are solved as a polynomial
+    polynomial_degree_max = 60
+
+    def __init__(self, transactions, guess=None, day_count=ACT_365F):
         self.transactions = transactions
-        self.sort_transactions()
         self.xirr = None
         self.guess = guess
+        self.day_count = day_count
+        self.stats = None
         self.error = False
+        self.cashflows = self.load_cashflows()
+        self.year_fracs, self.amounts = self.precompute_arrays()
 
-    def sort_transactions(self):
+    def load_cashflows(self):
+        # the caller's list is read, never sorted in place
+        if isinstance(self.transactions, Cashflows):
+            return self.transactions
         try:
-            self.transactions.sort(key=lambda x: [x[0], -x[1]])
-        except TypeError:
+            return Cashflows.from_transactions(self.transactions)
+        except (TypeError, ValueError, IndexError):
             self.error = True
+            return Cashflows(None, [], [], presorted=True)
+
+    def precompute_arrays(self):
+        """
+        year fractions from the first date (in the solver's day count convention) and the
+        amounts are computed once as float64 arrays so that every newton step is a single
+        vectorized pass over them.
+        """
+        if self.error or not len(self.cashflows):
+            return np.empty(0), np.empty(0)
+        cashflows = self.cashflows.sorted()
+        year_fracs, amounts, _ = merge_same_day(
+            cashflows.year_fractions(self.day_count), cashflows.amounts
+        )
+        return year_fracs, amounts
 
     def check_if_correct_transactions(self):
-        # Check that values contains at least one positive value and one negative value
-        positive = False
-        negative = False
-        # todo: scope of improvement
-        for t in self.transactions:
-            if t[1] > 0:
-                positive = True
-            if t[1] < 0:
-                negative = True
-            if positive and negative:
-                break
-        if positive and negative:
-            correct = True
-        else:
-            correct = False
-        return correct
+        return self.has_positive_and_negative(self.amounts)
 
     def set_guess_rate(self):
         if self.guess is None:
-            if sum(k[1] for k in self.transactions) > 0:
-                self.guess = -0.1
-            else:
-                self.guess = 0.1
+            self.guess = self.default_guess(self.amounts)
 
     def get_xirr(self):
-        transactions_correct = self.check_if_correct_transactions()
-        if transactions_correct and not self.error:
-
-            guesses_tried_pos = list(map(lambda x: -x, self.guess_vals_neg))
-            self.set_guess_rate()
-            if self.guess == guesses_tried_pos[0]:
-                guesses_try = guesses_tried_pos
-            else:
-                guesses_try = self.guess_vals_neg
-            guesses_try.reverse()
-            tries = 0
-            while tries < 1 or (self.xirr is None and len(guesses_try)):
-                self.guess = guesses_try.pop()
-                self.xirr = self.calculate_xirr()
-                tries += 1
+        if not self.error:
+            self.xirr = self.solve(self.year_fracs, self.amounts, self.guess, self.stats)
         return self.xirr
 
     def calculate_xirr(self):
+        return self.newtons_method(self.year_fracs, self.amounts, self.guess)
+
+    def implement_newtons_method(self):
+        return self._newtons_method(self.year_fracs, self.amounts, self.guess)
+
+    def irr_result(self, rate):
+        r = rate + 1
+        return float(np.sum(self.amounts / np.power(r, self.year_fracs)))
+
+    def irr_result_deriv(self, rate):
+        # Calculates the first derivation
+        r = rate + 1
+        return float(-np.sum(self.year_fracs * self.amounts / np.power(r, self.year_fracs + 1)))
+
+    def irr_result_and_deriv(self, rate):
+        return self.npv_and_deriv(self.year_fracs, self.amounts, rate)
+
+    # The solver core below only reads its arguments and the class level settings, every
+    # piece of per-solve state is local. It is safe to call from many threads at once.
+
+    @staticmethod
+    def has_positive_and_negative(amounts):
+        # Check that values contains at least one positive value and one negative value
+        return bool((amounts > 0).any() and (amounts < 0).any())
+
+    @staticmethod
+    def sign_changes(amounts):
+        # more than one sign change of the dated flows is what allows more than one xirr
+        signs = np.sign(amounts[amounts != 0])
+        return int(np.count_nonzero(signs[1:] != signs[:-1]))
+
+    @staticmethod
+    def default_guess(amounts):
+        return -0.1 if amounts.sum() > 0 else 0.1
+
+    @staticmethod
+    def modified_dietz(year_fracs, amounts):
+        """
+        annualised modified dietz return as a fraction, None where it is not defined. See
+        ``BatchXIRR.get_modified_dietz``.
+        """
+        dietz = BatchXIRR(year_fracs, amounts, [0, len(amounts)]).get_modified_dietz()[0]
+        return float(dietz) if np.isfinite(dietz) else None
+
+    @classmethod
+    def solve(cls, year_fracs, amounts, guess=None, stats=None):
+        """
+        xirr in percent. Two flows are solved in closed form. Otherwise newton's method
+        runs from the guess like Excel does, and restarts from each of ``guesses`` while it
+        fails; only then equally spaced flows are solved as a polynomial in
+        ``polynomial_rate``, and any other ledger is bracketed and found with the
+        safeguarded newton-bisection in ``bracketed_method``. None when there is no xirr
+        to be found.
+
+        A ``SolveStats`` passed as ``stats`` is filled with what the solve did.
+        """
+        if stats is None:
+            return cls._solve(year_fracs, amounts, guess)
+        started = time.perf_counter()
+        try:
+            return cls._solve(year_fracs, amounts, guess, stats)
+        finally:
+            stats.elapsed += time.perf_counter() - started
+
+    @classmethod
+    def _solve(cls, year_fracs, amounts, guess, stats=None):
+        if not cls.has_positive_and_negative(amounts):
+            cls._record_failure(stats, "no positive and negative flows")
+            return None
+        if len(amounts) == 2:
+            result_rate = cls.two_flow_rate(year_fracs, amounts)
+            if result_rate is None:
+                cls._record_failure(stats, "closed form out of range")
+            elif stats is not None:
+                stats.method = "closed form"
+            return result_rate
+        if guess is None:
+            guess = cls.default_guess(amounts)
+        for start in cls.guesses(amounts, guess):
+            result_rate = cls.newtons_method(year_fracs, amounts, start, stats)
+            if result_rate is not None:
+                if stats is not None:
+                    stats.method = "newton"
+                return result_rate
+        result_rate = cls.polynomial_rate(year_fracs, amounts, guess, stats)
+        if result_rate is not None:
+            if stats is not None:
+                stats.method = "polynomial"
+            return result_rate
+        bracket = cls.bracket(year_fracs, amounts, guess)
+        if bracket is None:
+            cls._record_failure(stats, "no sign change of the npv")
+            return None
+        if stats is not None:
+            stats.bracket = bracket[:2]
+            stats.iterations += len(cls.bracket_rates)
+        result_rate = cls.bracketed_method(year_fracs, amounts, *bracket, stats=stats)
+        if stats is not None and result_rate is not None:
+            stats.method = "bracketed"
+        return result_rate
+
+    @classmethod
+    def guesses(cls, amounts, guess=None):
+        """
+        starting rates newton is tried from in order: the guess, then the restart rates.
+        """
+        default = cls.default_guess(amounts)
+        if guess is None:
+            guess = default
+        guess_vals = cls.guess_vals_neg if default < 0 else tuple(-x for x in cls.guess_vals_neg)
+        return [guess] + [x for x in guess_vals if x != guess]
+
+    @staticmethod
+    def _record_failure(stats, reason):
+        if stats is not None:
+            stats.failures.append(reason)
+
+    @staticmethod
+    def two_flow_rate(year_fracs, amounts):
+        """
+        closed form xirr in percent of two opposite flows: ``a0 + a1 / (1 + r) ** t = 0``
+        gives ``r = (-a1 / a0) ** (1 / t) - 1``. None where it is not finite.
+        """
+        with np.errstate(all="ignore"):
+            rate = np.power(-amounts[1] / amounts[0], 1 / (year_fracs[1] - year_fracs[0])) - 1
+        return float(rate * 100) if np.isfinite(rate) else None
+
+    @classmethod
+    def polynomial_rate(cls, year_fracs, amounts, guess, stats=None):
+        """
+        flows on a grid, ``t_i = t_0 + k_i * h``, make the npv a polynomial of degree
+        ``max(k_i)`` in the discount factor ``x = (1 + r) ** -h``. Its positive real roots
+        are all the xirrs there are; they are tried closest to the guess first and
+        polished by newton. None when the flows are not on a grid of at most
+        ``polynomial_degree_max`` steps or no root polishes.
+        """
+        if len(amounts) < 3:
+            return None
+        offsets = year_fracs - year_fracs[0]
+        step = np.diff(offsets).min()
+        if step <= 0:
+            return None
+        steps = offsets / step
+        powers = np.rint(steps)
+        degree = powers.max()
+        if degree > cls.polynomial_degree_max or np.abs(steps - powers).max() > 1e-9 * degree:
+            # not on a grid, which is not a failure of the solve
+            return None
+        coefficients = np.zeros(int(degree) + 1)
+        np.add.at(coefficients, powers.astype(np.int64), amounts)
+        roots = np.roots(coefficients[::-1])
+        real = roots[(np.abs(roots.imag) <= 1e-9 * np.abs(roots)) & (roots.real > 0)].real
+        with np.errstate(all="ignore"):
+            rates = np.power(real, -1 / step) - 1
+        rates = rates[np.isfinite(rates)]
+        if not len(rates):
+            cls._record_failure(stats, "no positive real root of the polynomial")
+        for rate in rates[np.argsort(np.abs(rates - guess))]:
+            result_rate = cls.newtons_method(year_fracs, amounts, float(rate), stats)
+            if result_rate is not None:
+                return result_rate
+        return None
+
+    @classmethod
+    def bracket(cls, year_fracs, amounts, guess):
+        """
+        evaluates the npv over ``bracket_rates`` in one broadcast and returns the sign
+        changing interval closest to the guess as (low, high, npv at low), or None.
+        """
+        rates = np.asarray(cls.bracket_rates)
+        values = cls.xnpv(year_fracs, amounts, rates)
+        finite = np.flatnonzero(np.isfinite(values))
+        rates, values = rates[finite], values[finite]
+        changes = np.flatnonzero(np.sign(values[:-1]) * np.sign(values[1:]) <= 0)
+        if not len(changes):
+            return None
+        distance = np.maximum(rates[changes] - guess, 0) + np.maximum(guess - rates[changes + 1], 0)
+        i = changes[np.argmin(distance)]
+        return float(rates[i]), float(rates[i + 1]), float(values[i])
+
+    @classmethod
+    def bracketed_method(cls, year_fracs, amounts, low, high, low_value, stats=None):
+        """
+        newton steps kept inside a bracket [low, high] around the root, falling back to
+        bisection whenever newton would leave the bracket or is not shrinking it fast
+        enough. Every step at least halves the bracket or converges quadratically, so it
+        finishes within ``bracket_iter_max`` npv evaluations.
+        """
+        if low_value == 0:
+            return float(low * 100)
+        with np.errstate(all="ignore"):
+            dx_old = dx = high - low
+            result_rate = 0.5 * (low + high)
+            result_value, result_deriv = cls.npv_and_deriv(year_fracs, amounts, result_rate)
+            for _ in range(cls.bracket_iter_max):
+                if (
+                    ((result_rate - high) * result_deriv - result_value)
+                    * ((result_rate - low) * result_deriv - result_value)
+                    > 0
+                ) or abs(2 * result_value) > abs(dx_old * result_deriv):
+                    dx_old, dx = dx, 0.5 * (high - low)
+                    result_rate = low + dx
+                else:
+                    dx_old, dx = dx, result_value / result_deriv
+                    result_rate = result_rate - dx
+                if abs(dx) <= cls.eps_max_rate:
+                    return float(result_rate * 100)
+                if stats is not None:
+                    stats.iterations += 1
+                result_value, result_deriv = cls.npv_and_deriv(year_fracs, amounts, result_rate)
+                if abs(result_value) <= cls.eps_max_value:
+                    return float(result_rate * 100)
+                if (result_value > 0) == (low_value > 0):
+                    low, low_value = result_rate, result_value
+                else:
+                    high = result_rate
+        cls._record_failure(stats, "bracket iteration limit")
+        return None
+
+    @classmethod
+    def newtons_method(cls, year_fracs, amounts, guess, stats=None, iter_max=None):
+        if stats is not None:
+            stats.guesses.append(float(guess))
         try:
-            result_rate = self.implement_newtons_method()
+            result_rate = cls._newtons_method(year_fracs, amounts, guess, stats, iter_max)
             if type(result_rate) not in [float, int]:
                 return None
-        except (ZeroDivisionError, OverflowError, TypeError):
+        except (ZeroDivisionError, OverflowError, TypeError) as e:
+            cls._record_failure(stats, "{}: {}".format(type(e).__name__, e))
             result_rate = None
-        except Exception:
+        except Exception as e:
+            cls._record_failure(stats, "{}: {}".format(type(e).__name__, e))
             result_rate = None
         return result_rate
 
-    def implement_newtons_method(self):
-        result_rate = self.guess
+    @classmethod
+    def _newtons_method(cls, year_fracs, amounts, guess, stats=None, iter_max=None):
+        result_rate = guess
         # Implement Newton's method
         iteration = 0
         cont_loop = True
-        while cont_loop and (iteration < self.iter_max):
-            # Result  value  gives you residual value from the assumed rate of return
-            result_value = self.irr_result(result_rate)
-            new_rate = result_rate - (result_value / self.irr_result_deriv(result_rate))
+        with np.errstate(all="ignore"):
+            while cont_loop and (iteration < (iter_max or cls.iter_max)):
+                if stats is not None:
+                    stats.iterations += 1
+                # Result  value  gives you residual value from the assumed rate of return
+                result_value, result_deriv = cls.npv_and_deriv(year_fracs, amounts, result_rate)
+                new_rate = result_rate - (result_value / result_deriv)
+                if not np.isfinite(new_rate):
+                    # zero derivative, overflow or a rate at or below -100%
+                    cls._record_failure(stats, "newton step is not finite")
+                    return None
 
-            eps_rate = abs(new_rate - result_rate)
-            result_rate = new_rate
+                eps_rate = abs(new_rate - result_rate)
+                result_rate = new_rate
 
-            iteration += 1
-            cont_loop = (eps_rate > self.eps_max_rate) and (
-                abs(result_value) > self.eps_max_value
-            )
+                iteration += 1
+                cont_loop = (eps_rate > cls.eps_max_rate) and (
+                    abs(result_value) > cls.eps_max_value
+                )
         if cont_loop:
+            cls._record_failure(stats, "newton iteration limit")
             result_rate = None
         else:
-            result_rate = result_rate * 100
+            result_rate = float(result_rate * 100)
         return result_rate
 
-    def irr_result(self, rate):
-        r = rate + 1
-        result = 0
-        first = self.transactions[0]
-
-        for t in self.transactions:
-            frac = (t[0] - first[0]).days / 365
-            result += t[1] / pow(r, frac)
-        return result
+    @staticmethod
+    def xnpv(year_fracs, amounts, rates):
+        """
+        Equivalent of Excel's XNPV over any number of rates at once: the rates are
+        broadcast against the year fractions and summed in a single numpy operation.
+        Rates at or below -100% give inf.
+        """
+        rates = np.asarray(rates, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            values = (amounts / np.power(rates[..., None] + 1, year_fracs)).sum(axis=-1)
+        return np.where(rates <= -1, np.inf, values)
 
-    def irr_result_deriv(self, rate):
-        # Calculates the first derivation
+    @staticmethod
+    def npv_and_deriv(year_fracs, amounts, rate):
+        # npv and its first derivation share the discounted amounts, so both come out of one pass
         r = rate + 1
-        result = 0
-        first = self.transactions[0]
-        for t in self.transactions:
-            frac = (t[0] - first[0]).days / 365
-            result -= frac * t[1] / pow(r, frac + 1)
-        return result
+        growth = np.power(r, year_fracs)
+        if np.isinf(growth[-1] * r):
+            # same failure the scalar pow of the derivative, r ** (t + 1), raises, rather
+            # than discounting to zero
+            raise OverflowError("discount factor out of range")
+        discounted = amounts / growth
+        return discounted.sum(), -np.dot(year_fracs, discounted) / r
 
     def set_guess_for_extreme_cases(self):
-        pos_amt = sum(k[1] for k in self.transactions if k[1] > 0)
-        neg_amt = abs(sum(k[1] for k in self.transactions if k[1] < 0))
-        per = (self.transactions[-1][0] - self.transactions[0][0]).days / 365
-        self.guess = pow(neg_amt / pos_amt, 1 / per) - 1
+        pos_amt = self.amounts[self.amounts > 0].sum()
+        neg_amt = abs(self.amounts[self.amounts < 0].sum())
+        per = self.year_fracs[-1]
+        self.guess = float(pow(neg_amt / pos_amt, 1 / per) - 1)
+
+
+class IncrementalXIRR:
+    """
+    Keeps an append-only cashflow ledger sorted, with day offsets and amounts in growable
+    arrays, and re-solves xirr after every ``append`` starting from the previous rate.
+    Newton from the last rate typically converges in a step or two.
+
+    The warm start is only kept when the flows change sign once, so the ledger has a
+    single xirr, and newton reaches it within ``warm_iter_max`` steps no further than
+    ``warm_rate_change_max`` from the previous rate, at an npv below
+    ``warm_npv_tolerance`` of the discounted flows (tiny newton steps close to -100% are
+    not a root). Otherwise the ledger is solved afresh like ``XIRR`` does, so the result
+    never depends on the order of the appends.
+    """
+
+    initial_capacity = 16
+    warm_iter_max = 8
+    warm_rate_change_max = 0.5
+    warm_npv_tolerance = 1e-9
+
+    def __init__(self, transactions=None, guess=None, day_count=ACT_365F):
+        self.guess = guess
+        self.day_count = day_count
+        self.xirr = None
+        self.start = None
+        self.size = 0
+        self._days = np.empty(self.initial_capacity, dtype=np.int64)
+        self._year_fracs = np.empty(self.initial_capacity, dtype=np.float64)
+        self._amounts = np.empty(self.initial_capacity, dtype=np.float64)
+        if transactions:
+            self._load(sorted(transactions, key=lambda x: [x[0], -x[1]]))
+
+    @property
+    def year_fracs(self):
+        return self._year_fracs[: self.size]
+
+    @property
+    def amounts(self):
+        return self._amounts[: self.size]
+
+    def _load(self, transactions):
+        self.start = transactions[0][0]
+        self._reserve(len(transactions))
+        days = np.array([(t[0] - self.start).days for t in transactions], dtype=np.int64)
+        amounts = np.array([t[1] for t in transactions], dtype=np.float64)
+        days, amounts, _ = merge_same_day(days, amounts)
+        self.size = len(days)
+        self._days[: self.size] = days
+        self._amounts[: self.size] = amounts
+        self._year_fracs[: self.size] = self.fractions(days)
+        self.get_xirr()
+
+    def _reserve(self, size):
+        capacity = len(self._days)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_days", "_year_fracs", "_amounts"):
+            grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+            grown[: self.size] = getattr(self, name)[: self.size]
+            setattr(self, name, grown)
+
+    def append(self, date, amount):
+        """
+        adds one cashflow to the ledger and returns the re-solved xirr in percent.
+        """
+        if self.start is None:
+            self.start = date
+        day = (date - self.start).days
+        if day < 0:
+            # a flow before the first one moves the origin of every offset
+            self._days[: self.size] -= day
+            self._year_fracs[: self.size] = self.fractions(self._days[: self.size])
+            self.start = date
+            day = 0
+        position = int(np.searchsorted(self._days[: self.size], day))
+        if position < self.size and self._days[position] == day:
+            # same day as an existing flow, merged into it like the other solvers do
+            self._amounts[position] += amount
+            return self.get_xirr()
+        self._reserve(self.size + 1)
+        if position < self.size:
+            for name in ("_days", "_year_fracs", "_amounts"):
+                values = getattr(self, name)
+                values[position + 1:self.size + 1] = values[position:self.size]
+        self._days[position] = day
+        self._year_fracs[position] = self.fractions(np.array([day]))[0]
+        self._amounts[position] = amount
+        self.size += 1
+        return self.get_xirr()
+
+    def is_root(self, rate):
+        with np.errstate(all="ignore"):
+            discounted = self.amounts / np.power(rate + 1, self.year_fracs)
+        return bool(
+            abs(discounted.sum()) <= self.warm_npv_tolerance * np.abs(discounted).sum()
+        )
+
+    def fractions(self, days):
+        # year fractions of day offsets from the start in the ledger's convention
+        start = np.datetime64(self.start, "D")
+        return year_fractions(start + days.astype("timedelta64[D]"), start, self.day_count)
+
+    def get_xirr(self):
+        year_fracs, amounts = self.year_fracs, self.amounts
+        if self.xirr is not None and XIRR.sign_changes(amounts) == 1:
+            previous = self.xirr / 100
+            result_rate = XIRR.newtons_method(
+                year_fracs, amounts, previous, iter_max=self.warm_iter_max
+            )
+            if (
+                result_rate is not None
+                and abs(result_rate / 100 - previous) <= self.warm_rate_change_max
+                and self.is_root(result_rate / 100)
+            ):
+                self.xirr = result_rate
+                return self.xirr
+        self.xirr = XIRR.solve(year_fracs, amounts, self.guess)
+        return self.xirr
+
+
+class BatchXIRR:
+    """
+    Solves xirr for many portfolios at once. Cashflows of all portfolios are packed into
+    flat year fraction and amount arrays, with ``offsets[i]:offsets[i + 1]`` marking the
+    flows of portfolio ``i``, and newton steps run on every unconverged portfolio together.
+    Portfolios the batched newton can not converge fall back to ``XIRR.solve``.
+    """
+
+    CONVERGED = 0
+    FALLBACK = 1
+    FAILED = 2
+
+    def __init__(self, year_fracs, amounts, offsets):
+        self.year_fracs = np.asarray(year_fracs, dtype=np.float64)
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.count = len(self.offsets) - 1
+        self.segments = np.repeat(np.arange(self.count), np.diff(self.offsets))
+
+    @classmethod
+    def from_sorted_arrays(cls, year_fracs, amounts, segments, count):
+        """
+        packs flows already sorted by (segment, year fraction), merging same day flows.
+        """
+        year_fracs, amounts, segments = merge_same_day(
+            np.asarray(year_fracs, dtype=np.float64),
+            np.asarray(amounts, dtype=np.float64),
+            np.asarray(segments, dtype=np.int64),
+        )
+        offsets = np.searchsorted(segments, np.arange(count + 1))
+        return cls(year_fracs, amounts, offsets)
+
+    @classmethod
+    def from_cashflow_sets(cls, cashflow_sets, day_count=ACT_365F):
+        """
+        packs a list of cashflow sets, each a list of (date, amount) or a ``Cashflows``.
+        The rows of every set are flattened into long format and sorted together by
+        ``from_grouped_arrays``, the caller's lists are not touched.
+        """
+        codes, dates, amounts = [], [], []
+        ledgers = []
+        for i, cashflows in enumerate(cashflow_sets):
+            if isinstance(cashflows, Cashflows):
+                if len(cashflows):
+                    ledgers.append((np.full(len(cashflows), i), cashflows.dates, cashflows.amounts))
+                continue
+            codes.extend([i] * len(cashflows))
+            dates.extend(t[0] for t in cashflows)
+            amounts.extend(t[1] for t in cashflows)
+        ledgers.append(
+            (np.asarray(codes, dtype=np.int64), np.array(dates, dtype="datetime64[D]"), amounts)
+        )
+        codes, dates, amounts = (np.concatenate(part) for part in zip(*ledgers))
+        return cls.from_grouped_arrays(
+            codes, dates, amounts, count=len(cashflow_sets), day_count=day_count
+        )
+
+    @classmethod
+    def from_grouped_arrays(cls, codes, dates, amounts, count=None, day_count=ACT_365F):
+        """
+        packs long format arrays where ``codes[i]`` in ``0..count - 1`` is the portfolio of
+        row ``i``. Rows are sorted once by (code, date) and split at the code boundaries;
+        portfolios without any row end up empty.
+        """
+        codes, dates, amounts, offsets = pack_by_group(codes, dates, amounts, count)
+        count = len(offsets) - 1
+        sizes = np.diff(offsets)
+        firsts = np.repeat(dates[offsets[:-1][sizes > 0]], sizes[sizes > 0])
+        year_fracs = year_fractions(dates, firsts, day_count)
+        return cls.from_sorted_arrays(year_fracs, amounts, codes, count)
+
+    def take(self, indices):
+        """
+        a batch of the given portfolios only, in the given order.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        sizes = np.diff(self.offsets)[indices]
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        flows = np.arange(offsets[-1]) + np.repeat(self.offsets[indices] - offsets[:-1], sizes)
+        return BatchXIRR(self.year_fracs[flows], self.amounts[flows], offsets)
+
+    def check_if_correct_transactions(self):
+        positive = np.bincount(self.segments, self.amounts > 0, minlength=self.count)
+        negative = np.bincount(self.segments, self.amounts < 0, minlength=self.count)
+        return (positive > 0) & (negative > 0)
+
+    def get_guess_rates(self):
+        totals = np.bincount(self.segments, self.amounts, minlength=self.count)
+        return np.where(totals > 0, -0.1, 0.1)
+
+    def get_two_flow_rates(self):
+        """
+        closed form rate (as a fraction) of every portfolio of exactly two flows, see
+        ``XIRR.two_flow_rate``. nan for the other portfolios, which go through newton.
+        """
+        starts = self.offsets[:-1]
+        pairs = np.flatnonzero(np.diff(self.offsets) == 2)
+        rates = np.full(self.count, np.nan)
+        first, last = starts[pairs], starts[pairs] + 1
+        with np.errstate(all="ignore"):
+            rates[pairs] = np.power(
+                -self.amounts[last] / self.amounts[first],
+                1 / (self.year_fracs[last] - self.year_fracs[first]),
+            ) - 1
+        return rates
+
+    def implement_newtons_method(self, rates, active, stats=None):
+        """
+        runs newton on every active portfolio at once, with the same stopping rule as
+        ``XIRR.implement_newtons_method``. returns the rates and a converged mask.
+        """
+        converged = np.zeros(self.count, dtype=bool)
+        iteration = 0
+        with np.errstate(all="ignore"):
+            while active.any() and iteration < XIRR.iter_max:
+                if stats is not None:
+                    stats.newton_passes += 1
+                    stats.iterations += int(active.sum())
+                flows = active[self.segments]
+                segments = self.segments[flows]
+                year_fracs = self.year_fracs[flows]
+                growth = np.power(rates[segments] + 1, year_fracs)
+                discounted = self.amounts[flows] / growth
+                result_value = np.bincount(segments, discounted, minlength=self.count)
+                result_deriv = -np.bincount(
+                    segments, year_fracs * discounted, minlength=self.count
+                ) / (rates + 1)
+                overflow = np.bincount(
+                    segments, np.isinf(growth * (rates[segments] + 1)), minlength=self.count
+                ) > 0
+                new_rates = rates - result_value / result_deriv
+
+                ok = active & np.isfinite(new_rates) & ~overflow
+                eps_rate = np.abs(new_rates - rates)
+                rates = np.where(ok, new_rates, rates)
+                cont_loop = (eps_rate > XIRR.eps_max_rate) & (
+                    np.abs(result_value) > XIRR.eps_max_value
+                )
+                converged |= ok & ~cont_loop
+                active = ok & cont_loop
+                iteration += 1
+        return rates, converged
+
+    def get_modified_dietz(self):
+        """
+        annualised modified dietz return of every portfolio, as a fraction, from the same
+        packed arrays the solver uses. The last flow closes the period, each flow is
+        weighted by the share of the period it was invested for, and the period return
+        ``gain / average capital`` is compounded to a year. Either sign convention works:
+        with investments negative, gain and capital are both negated. nan where it is not
+        defined.
+        """
+        sizes = np.diff(self.offsets)
+        filled = sizes > 0
+        periods = np.zeros(self.count)
+        periods[filled] = self.year_fracs[self.offsets[1:][filled] - 1]
+        with np.errstate(all="ignore"):
+            weights = 1 - self.year_fracs / periods[self.segments]
+            gain = -np.bincount(self.segments, self.amounts, minlength=self.count)
+            capital = np.bincount(self.segments, self.amounts * weights, minlength=self.count)
+            period_return = gain / capital
+            annual = np.power(1 + period_return, 1 / periods) - 1
+        defined = (periods > 0) & (capital != 0) & (period_return > -1)
+        return np.where(defined & np.isfinite(annual), annual, np.nan)
+
+    def get_dietz_guess_rates(self):
+        # modified dietz where it is defined and finite, the usual guess elsewhere
+        dietz = self.get_modified_dietz()
+        return np.where(np.isfinite(dietz), dietz, self.get_guess_rates())
+
+    def get_xirr(self, guesses=None, dietz_guess=False, stats=None):
+        """
+        :param guesses: optional array of starting rates (as fractions), one per portfolio
+        :param dietz_guess: start from the modified dietz return instead of the usual guess
+        :param stats: optional ``BatchStats`` to add the counters of this run to
+        :return: (rates, status) arrays, rates in percent and nan where no xirr was found
+        """
+        started = time.perf_counter()
+        correct = self.check_if_correct_transactions()
+        if guesses is None:
+            guesses = self.get_dietz_guess_rates() if dietz_guess else self.get_guess_rates()
+        two_flow_rates = self.get_two_flow_rates()
+        two_flows = correct & np.isfinite(two_flow_rates)
+        rates, converged = self.implement_newtons_method(
+            np.where(two_flows, two_flow_rates, guesses).astype(np.float64),
+            correct & ~two_flows,
+            stats,
+        )
+        if stats is not None:
+            stats.methods["closed form"] += int(two_flows.sum())
+            stats.methods["batched newton"] += int(converged.sum())
+        converged |= two_flows
+        xirr = np.where(converged, rates * 100, np.nan)
+        status = np.where(converged, self.CONVERGED, self.FAILED)
+
+        for i in np.flatnonzero(correct & ~converged):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            solve_stats = SolveStats() if stats is not None else None
+            result = XIRR.solve(
+                self.year_fracs[start:end], self.amounts[start:end], stats=solve_stats
+            )
+            if result is not None:
+                xirr[i] = result
+                status[i] = self.FALLBACK
+            if stats is not None:
+                stats.record_fallback(int(i), solve_stats)
+
+        if stats is not None:
+            stats.portfolios += self.count
+            stats.invalid += int((~correct).sum())
+            stats.converged += int((status == self.CONVERGED).sum())
+            stats.fallback += int((status == self.FALLBACK).sum())
+            stats.failed += int((status == self.FAILED).sum())
+            stats.elapsed += time.perf_counter() - started
+        return xirr, status
+
+    def shards(self, count):
+        """
+        splits the portfolios into ``count`` contiguous ranges holding about the same
+        number of cashflows each. returns the boundaries as portfolio indices.
+        """
+        targets = np.linspace(0, self.offsets[-1], count + 1)
+        bounds = np.unique(np.searchsorted(self.offsets, targets))
+        bounds[0], bounds[-1] = 0, self.count
+        return np.unique(bounds)
+
+    def shard(self, start, end):
+        # packed (year_fracs, amounts, offsets) of the portfolios from start to end - 1
+        first, last = self.offsets[start], self.offsets[end]
+        return (
+            self.year_fracs[first:last],
+            self.amounts[first:last],
+            self.offsets[start:end + 1] - first,
+        )
+
+    def get_xirr_parallel(self, n_jobs=None, executor=None, dietz_guess=False, stats=None):
+        """
+        same as ``get_xirr``, with the portfolios sharded across worker processes. The packed
+        arrays are placed in shared memory once and every worker solves its shard on a view
+        of them, so no cashflows are pickled (before python 3.8, which has no shared memory,
+        every worker is sent the slices of its shard). A running ``executor`` can be passed
+        instead of ``n_jobs``. The counters of every shard are merged into ``stats``, so
+        its ``elapsed`` and ``newton_passes`` add up the work of all workers.
+
+        :return: (rates, status) arrays
+        """
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = os.cpu_count() or 1
+        xirr = np.full(self.count, np.nan)
+        status = np.full(self.count, self.FAILED)
+        if not self.count:
+            return xirr, status
+
+        blocks = []
+        try:
+            arrays = []
+            for values in (self.year_fracs, self.amounts, self.offsets):
+                if shared_memory is None:
+                    break
+                block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+                arrays.append((block.name, values.shape, values.dtype.str))
+
+            owns_executor = executor is None
+            if owns_executor:
+                executor = ProcessPoolExecutor(max_workers=n_jobs)
+            try:
+                # a few shards per worker so stragglers in one shard do not idle the rest
+                bounds = self.shards(n_jobs * 4)
+                futures = []
+                for start, end in zip(bounds[:-1], bounds[1:]):
+                    if arrays:
+                        task = (_solve_shared_shard, arrays, start, end)
+                    else:
+                        task = (_solve_shard, start) + self.shard(start, end)
+                    futures.append(executor.submit(*task, dietz_guess, stats is not None))
+                for future in futures:
+                    start, rates, statuses, shard_stats = future.result()
+                    xirr[start:start + len(rates)] = rates
+                    status[start:start + len(rates)] = statuses
+                    if stats is not None:
+                        stats.merge(shard_stats, start)
+            finally:
+                if owns_executor:
+                    executor.shutdown()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        return xirr, status
+
+
+def _solve_shard(start, year_fracs, amounts, offsets, dietz_guess=False, with_stats=False):
+    # runs in the worker process on the packed arrays of the shard's portfolios only
+    batch = BatchXIRR(year_fracs, amounts, offsets)
+    stats = BatchStats() if with_stats else None
+    rates, status = batch.get_xirr(dietz_guess=dietz_guess, stats=stats)
+    return int(start), rates, status, stats
+
+
+def _solve_shared_shard(arrays, start, end, dietz_guess=False, with_stats=False):
+    # runs in the worker process, on views of the parent's shared memory
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in arrays]
+    try:
+        year_fracs, amounts, offsets = [
+            np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            for block, (_, shape, dtype) in zip(blocks, arrays)
+        ]
+        first, last = offsets[start], offsets[end]
+        result = _solve_shard(
+            start,
+            year_fracs[first:last],
+            amounts[first:last],
+            offsets[start:end + 1] - first,
+            dietz_guess,
+            with_stats,
+        )
+        del year_fracs, amounts, offsets
+    finally:
+        for block in blocks:
+            block.close()
+    return result
+
+
+def solve_in_blocks(count, pack, block_size):
+    """
+    xirr of ``count`` ledgers in order, ``block_size`` at a time: ``pack(block)`` returns
+    the ``BatchXIRR`` of the ledgers in the ``block`` slice. Every block starts newton from
+    the last rate solved in the previous block, which is close when neighbouring ledgers
+    overlap as much as rolling ones do.
+
+    :return: array of rates in percent, nan where no xirr was found
+    """
+    xirr = np.full(count, np.nan)
+    guess = None
+    for first in range(0, count, block_size):
+        block = slice(first, first + block_size)
+        batch = pack(block)
+        guesses = None if guess is None else np.full(batch.count, guess)
+        rates, _ = batch.get_xirr(guesses)
+        xirr[block] = rates
+        solved = rates[np.isfinite(rates)]
+        if len(solved):
+            guess = solved[-1] / 100
+    return xirr
+
+
+class RollingXIRR:
+    """
+    xirr of a cashflow ledger as of every nav date, valuing the units held that day at
+    that day's nav. Each cashflow buys (or, when negative, sells) ``amount / nav`` units.
+
+    The as-of dates are solved with ``solve_in_blocks``: every block is packed like
+    ``BatchXIRR`` with the ledger up to each date plus a closing flow of the holding's value.
+    """
+
+    block_size = 256
+
+    def __init__(self, cashflows, nav_dates, navs, day_count=ACT_365F):
+        cashflows = cashflows.sorted()
+        days, self.amounts, _ = merge_same_day(cashflows.days, cashflows.amounts)
+        self.day_count = day_count
+        self.days = days.astype(np.int64)
+        self.start = cashflows.start
+        self.year_fracs = year_fractions(
+            self.start + self.days.astype("timedelta64[D]"), self.start, day_count
+        )
+        self.nav_dates = np.asarray(nav_dates).astype("datetime64[D]")
+        self.navs = np.asarray(navs, dtype=np.float64)
+        flow_dates = self.start + days.astype("timedelta64[D]")
+        nav_index = np.searchsorted(self.nav_dates, flow_dates, side="right") - 1
+        if (nav_index < 0).any():
+            raise ValueError("nav data must start on or before the first cashflow")
+        self.units = np.cumsum(self.amounts / self.navs[nav_index])
+
+    def get_xirr(self):
+        """
+        :return: (as-of dates, rates in percent) arrays, nan where no xirr was found
+        """
+        asof = np.flatnonzero(self.nav_dates >= self.start)
+        asof_dates = self.nav_dates[asof]
+        asof_days = (asof_dates - self.start).astype(np.int64)
+        asof_fracs = year_fractions(asof_dates, self.start, self.day_count)
+        # number of ledger flows on or before each as-of date, and the closing value
+        counts = np.searchsorted(self.days, asof_days, side="right")
+        values = self.units[counts - 1] * self.navs[asof]
+
+        xirr = solve_in_blocks(
+            len(asof),
+            lambda block: self.pack(counts[block], asof_fracs[block], values[block]),
+            self.block_size,
+        )
+        return asof_dates, xirr
+
+    def pack(self, counts, asof_fracs, values):
+        # ledger flows [0, count) followed by a closing flow of -value for every as-of date
+        sizes = counts + 1
+        ends = np.cumsum(sizes)
+        segments = np.repeat(np.arange(len(sizes)), sizes)
+        position = np.arange(ends[-1]) - np.repeat(ends - sizes, sizes)
+        closing = position == counts[segments]
+        flow = np.minimum(position, len(self.amounts) - 1)
+        year_fracs = np.where(closing, asof_fracs[segments], self.year_fracs[flow])
+        amounts = np.where(closing, -values[segments], self.amounts[flow])
+        return BatchXIRR.from_sorted_arrays(year_fracs, amounts, segments, len(sizes))
+
+
+class RollingSIP:
+    """
+    xirr of a systematic investment plan started on every nav date: ``amount`` invested
+    every period for ``installments`` periods, each installment buying ``amount / nav``
+    units at the nav on or before its date, and the units valued at the nav one period
+    after the last installment. Only start dates whose plan ends within the nav data are
+    solved. Start dates are packed into ``BatchXIRR`` blocks and solved with
+    ``solve_in_blocks`` like ``RollingXIRR``.
+    """
+
+    block_size = 256
+    # frequency: (step, unit of the step, periods in a year)
+    frequencies = {
+        "daily": (1, "D", 365),
+        "weekly": (7, "D", 52),
+        "monthly": (1, "M", 12),
+        "quarterly": (3, "M", 4),
+    }
+
+    def __init__(
+        self, nav_dates, navs, amount, frequency="monthly", installments=36, day_count=ACT_365F
+    ):
+        if frequency not in self.frequencies:
+            raise ValueError(
+                "frequency must be one of {}".format(", ".join(sorted(self.frequencies)))
+            )
+        if installments < 1:
+            raise ValueError("a sip needs at least one installment")
+        self.nav_dates = np.asarray(nav_dates).astype("datetime64[D]")
+        self.navs = np.asarray(navs, dtype=np.float64)
+        self.amount = float(amount)
+        self.frequency = frequency
+        self.installments = int(installments)
+        self.day_count = day_count
+
+    @classmethod
+    def from_tenure(cls, nav_dates, navs, amount, frequency="monthly", tenure=3, day_count=ACT_365F):
+        """
+        :param tenure: years of installments, rounded to a whole number of periods
+        """
+        periods = cls.frequencies.get(frequency, (None, None, 0))[2]
+        return cls(
+            nav_dates, navs, amount, frequency, int(round(tenure * periods)), day_count
+        )
+
+    def add_periods(self, dates, periods):
+        """
+        dates ``periods`` steps of the sip frequency after ``dates``, broadcasting the two.
+        Monthly steps keep the day of the month, clamped to the length of the month.
+        """
+        step, unit, _ = self.frequencies[self.frequency]
+        periods = np.asarray(periods) * step
+        if unit == "D":
+            return dates + periods.astype("timedelta64[D]")
+        month_starts = dates.astype("datetime64[M]")
+        day = dates - month_starts.astype("datetime64[D]")
+        months = month_starts + periods.astype("timedelta64[M]")
+        first_days = months.astype("datetime64[D]")
+        last_day = (months + np.timedelta64(1, "M")).astype("datetime64[D]") - first_days
+        return first_days + np.minimum(day, last_day - np.timedelta64(1, "D"))
+
+    def get_xirr(self):
+        """
+        :return: (start dates, rates in percent) arrays, nan where no xirr was found
+        """
+        ends = self.add_periods(self.nav_dates, self.installments)
+        starts = self.nav_dates[ends <= self.nav_dates[-1]] if len(self.nav_dates) else ends
+        xirr = solve_in_blocks(
+            len(starts), lambda block: self.pack(starts[block]), self.block_size
+        )
+        return starts, xirr
+
+    def pack(self, starts):
+        # a row of installments followed by the closing value for every start date
+        dates = self.add_periods(starts[:, None], np.arange(self.installments + 1))
+        navs = self.navs[np.searchsorted(self.nav_dates, dates, side="right") - 1]
+        amounts = np.full(dates.shape, self.amount)
+        amounts[:, -1] = -(self.amount / navs[:, :-1]).sum(axis=1) * navs[:, -1]
+        year_fracs = year_fractions(dates, dates[:, :1], self.day_count)
+        segments = np.repeat(np.arange(len(starts)), self.installments + 1)
+        return BatchXIRR.from_sorted_arrays(
+            year_fracs.ravel(), amounts.ravel(), segments, len(starts)
+        )
+
+
+def segment_cumprod(values, offsets):
+    """
+    cumulative product restarting at every ``offsets`` boundary, as a cumulative sum of
+    logs so it stays one vectorized pass however many segments there are. Values at or
+    below zero zero out the rest of their segment.
+    """
+    sizes = np.diff(offsets)
+    zero = values <= 0
+    with np.errstate(divide="ignore"):
+        logs = np.cumsum(np.log(np.where(zero, 1.0, values)))
+    zeros = np.cumsum(zero)
+    starts = np.repeat(offsets[:-1], sizes)
+    logs_before = np.concatenate(([0.0], logs))[starts]
+    zeros_before = np.concatenate(([0], zeros))[starts]
+    return np.where(zeros - zeros_before > 0, 0.0, np.exp(logs - logs_before))
+
+
+class TWRR:
+    """
+    Time weighted return of one or many cashflow ledgers against their valuations. Every
+    valuation closes a sub-period; the cashflows since the previous valuation are taken to
+    happen at the close (the way units are bought at the day's nav), so the sub-period
+    return is ``(value - cashflows) / previous value - 1``. Sub-period returns are chained
+    with a segmented cumulative product.
+
+    Ledgers and valuations are long format arrays with a group code per row, packed the
+    same way as for ``BatchXIRR``.
+    """
+
+    def __init__(self, codes, dates, amounts, valuation_codes, valuation_dates, values, count):
+        codes, dates, amounts, _ = pack_by_group(codes, dates, amounts, count)
+        (
+            self.valuation_codes,
+            self.valuation_dates,
+            self.values,
+            self.offsets,
+        ) = pack_by_group(valuation_codes, valuation_dates, values, count)
+        self.count = count
+        self.flows = self.assign_flows(codes, dates, amounts)
+
+    @classmethod
+    def from_ledger(cls, cashflows, valuation_dates, values):
+        """
+        :param cashflows: Cashflows
+        :param valuation_dates: array of dates
+        :param values: array of portfolio values at the close of each date
+        """
+        return cls(
+            np.zeros(len(cashflows), dtype=np.int64),
+            cashflows.dates if len(cashflows) else np.array([], dtype="datetime64[D]"),
+            cashflows.amounts,
+            np.zeros(len(values), dtype=np.int64),
+            valuation_dates,
+            values,
+            1,
+        )
+
+    def assign_flows(self, codes, dates, amounts):
+        # every cashflow lands in the sub-period closing at the first valuation on or after it
+        if not len(amounts) or not len(self.values):
+            return np.zeros(len(self.values))
+        origin = min(dates.min(), self.valuation_dates.min())
+        span = (max(dates.max(), self.valuation_dates.max()) - origin).astype(np.int64) + 1
+        valuation_keys = self.valuation_codes * span + (self.valuation_dates - origin).astype(np.int64)
+        keys = codes * span + (dates - origin).astype(np.int64)
+        index = np.searchsorted(valuation_keys, keys)
+        inside = index < len(valuation_keys)
+        inside[inside] = self.valuation_codes[index[inside]] == codes[inside]
+        return np.bincount(index[inside], amounts[inside], minlength=len(self.values))
+
+    def get_sub_period_returns(self):
+        previous = np.empty_like(self.values)
+        previous[1:] = self.values[:-1]
+        previous[self.offsets[:-1][np.diff(self.offsets) > 0]] = 0
+        with np.errstate(all="ignore"):
+            return np.where(previous > 0, (self.values - self.flows) / previous - 1, 0.0)
+
+    def get_twrr(self):
+        """
+        :return: cumulative twrr in percent at every valuation, in packed order
+        """
+        growth = 1 + self.get_sub_period_returns()
+        return (segment_cumprod(growth, self.offsets) - 1) * 100
+
+    def get_total_twrr(self):
+        """
+        :return: twrr in percent over each group's whole valuation history, nan when empty
+        """
+        cumulative = self.get_twrr()
+        total = np.full(self.count, np.nan)
+        filled = np.diff(self.offsets) > 0
+        total[filled] = cumulative[self.offsets[1:][filled] - 1]
+        return total
@@ -1,3 +1,8 @@
+import collections
+import functools
+import inspect
+import threading
+
 import numpy as np
 import pandas as pd
 import math
@@ -6,13 +11,145 @@ days_in_year = 250
 default_risk_free_rate = 0.05
 
 
+def rolling_prod(values, window):
+    """
+    product of every ``window`` consecutive values, same as
+    ``rolling(window).apply(np.prod, raw=True)`` in O(n) instead of O(n * window).
+    Logs of the magnitudes are summed with prefix sums, and zeros and negative values are
+    counted the same way to set the product to zero or flip its sign. Windows holding a
+    nan, and the first ``window - 1`` positions, are nan.
+
+    :param values: array of floats
+    :param window: int
+    :return: numpy array of the same length
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if window > len(values):
+        return result
+    missing = np.isnan(values)
+    zero = values == 0
+    negative = values < 0
+
+    def window_sums(x):
+        sums = np.concatenate(([0], np.cumsum(x)))
+        return sums[window:] - sums[:-window]
+
+    products = np.exp(window_sums(np.log(np.abs(np.where(missing | zero, 1, values)))))
+    products[window_sums(negative) % 2 == 1] *= -1
+    products[window_sums(zero) > 0] = 0
+    products[window_sums(missing) > 0] = np.nan
+    result[window - 1:] = products
+    return result
+
+
+def rolling_sum(values, window, valid=None):
+    """
+    sum of every ``window`` consecutive values from one prefix sum, same as
+    ``rolling(window).sum()``: nan where the window holds a value that is not ``valid``
+    (by default, a nan) and for the first ``window - 1`` positions.
+
+    :param values: array of floats
+    :param window: int
+    :param valid: optional boolean array
+    :return: numpy array of the same length
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if valid is None:
+        valid = ~np.isnan(values)
+    result = np.full(len(values), np.nan)
+    if window > len(values):
+        return result
+    sums = np.concatenate(([0], np.cumsum(np.where(valid, values, 0))))
+    invalid = np.concatenate(([0], np.cumsum(~valid)))
+    window_sums = sums[window:] - sums[:-window]
+    window_sums[invalid[window:] - invalid[:-window] > 0] = np.nan
+    result[window - 1:] = window_sums
+    return result
+
+
+class RollingMoments:
+    """
+    rolling means, variances and covariances (ddof 1, like pandas) of named series over one
+    window, derived from window sums of the series and of their products. Every window
+    sum is computed once, on first use, however many ratios need it. The series are
+    centred on their mean first, which leaves the moments unchanged and keeps the prefix
+    sums small.
+    """
+
+    def __init__(self, window, **series):
+        self.window = window
+        self.offsets = {}
+        self.centred = {}
+        self.valid = {}
+        for name, values in series.items():
+            values = np.asarray(values, dtype=np.float64)
+            self.valid[name] = ~np.isnan(values)
+            self.offsets[name] = values[self.valid[name]].mean() if self.valid[name].any() else 0
+            self.centred[name] = values - self.offsets[name]
+        self.sums = {}
+
+    def centred_sum(self, names, masked_by):
+        """
+        window sums of the product of the centred ``names`` series, counting only the rows
+        where every series in ``masked_by`` is there.
+        """
+        key = (tuple(sorted(names)), tuple(sorted(set(masked_by))))
+        if key not in self.sums:
+            values = np.prod([self.centred[name] for name in names], axis=0)
+            valid = np.logical_and.reduce([self.valid[name] for name in masked_by])
+            self.sums[key] = rolling_sum(values, self.window, valid)
+        return self.sums[key]
+
+    def mean(self, name):
+        return self.centred_sum((name,), (name,)) / self.window + self.offsets[name]
+
+    def cov(self, name, other, masked_by=None):
+        """
+        :param masked_by: series whose rows must all be there, ``name`` and ``other`` by default
+        """
+        masked_by = masked_by or (name, other)
+        n = self.window
+        total = self.centred_sum((name,), masked_by)
+        other_total = self.centred_sum((other,), masked_by)
+        return (self.centred_sum((name, other), masked_by) - total * other_total / n) / (n - 1)
+
+    def var(self, name, masked_by=None):
+        # rounding can leave a constant window a hair below zero
+        return np.maximum(self.cov(name, name, masked_by), 0)
+
+
+def cached_metric(method):
+    """
+    memoizes a ``RatioCalculator`` metric in the calculator's LRU metric cache, keyed by
+    the metric name and all its arguments (defaults filled in), so ``get_beta(250)`` and
+    ``get_beta(window=250)`` share an entry and ``get_beta(750)`` gets its own.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (method.__name__,) + tuple(arguments.arguments.items())[1:]
+        return self.get_cached(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
+
+
 class RatioCalculator:
+    # synthetic risk free benchmark navs, shared by calculators over the same dates
+    benchmark_cache_size = 128
+    _benchmark_cache = collections.OrderedDict()
+    _benchmark_lock = threading.Lock()
+
     def __init__(
         self,
         nav_dataframe,
         benchmark_nav_dataframe=None,
         risk_free_rate=None,
         annualiser=None,
+        cache_size=64,
     ):
         self_nav_df = self._load(nav_dataframe)
         self.risk_free_rate = risk_free_rate
@@ -22,34 +159,76 @@ class RatioCalculator:
                 nav_dataframe, risk_free_rate
             )
         benchmark_nav_df = self._load(benchmark_nav_dataframe)
+        # the aligned base data, only ever read: every metric builds its own result frame
         self.combo_nav_df = self._merge(self_nav_df, benchmark_nav_df)
-        self.beta_cache = None
+        # metric results by (metric, arguments), least recently used first
+        self.cache_size = cache_size
+        self.metric_cache = collections.OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache_lock = threading.Lock()
+
+    def get_cached(self, key, compute):
+        """
+        the cached result for ``key``, or the result of ``compute()`` which is then kept,
+        evicting the least recently used results beyond ``cache_size``. Callers get a copy,
+        so changing a returned frame leaves the cached one as it was.
+        """
+        with self._cache_lock:
+            if key in self.metric_cache:
+                self.cache_hits += 1
+                self.metric_cache.move_to_end(key)
+                return self.metric_cache[key].copy()
+            self.cache_misses += 1
+        result = compute()
+        with self._cache_lock:
+            self.metric_cache[key] = result
+            while len(self.metric_cache) > self.cache_size:
+                self.metric_cache.popitem(last=False)
+        return result.copy()
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self.metric_cache.clear()
 
     @staticmethod
     def _load(data,):
         if data is None:
             return pd.DataFrame()
-        ret = "returns"
-        data[ret] = data["nav"].pct_change()
-
-        return data
+        # a new frame, the caller's data is not written to
+        return data.assign(returns=data["nav"].pct_change())
 
     def create_benchmark_nav_from_risk_free_rate(self, nav_dataframe, risk_free_rate):
         if not risk_free_rate:
             return None
-        initial_value = 100
-        risk_free_rate = risk_free_rate / self.annualiser
-        benchmark_nav_df = nav_dataframe.filter(["nav"])
-        initial_index = benchmark_nav_df.index.min()
+        navs = self.get_risk_free_navs(nav_dataframe.index, risk_free_rate, self.annualiser)
+        return pd.DataFrame({"nav": navs}, index=nav_dataframe.index)
 
-        def apply_drag(row, initial_value, initial_index, rate):
-            count = (row.name - initial_index).days
-            return initial_value * math.pow(1 + rate, count)
-
-        benchmark_nav_df["nav"] = benchmark_nav_df.apply(
-            apply_drag, args=(initial_value, initial_index, risk_free_rate), axis=1
-        )
-        return benchmark_nav_df.filter(["nav"])
+    @classmethod
+    def get_risk_free_navs(cls, index, risk_free_rate, annualiser):
+        """
+        navs of a benchmark starting at 100 on the first date and compounding
+        ``risk_free_rate / annualiser`` for every day since, in one vectorized pass over the
+        day offsets. The read-only result is cached per (dates, rate, annualiser), so
+        calculators over the same calendar share one curve.
+        """
+        days = np.asarray(index.values).astype("datetime64[D]").astype(np.int64)
+        # the raw bytes of the day numbers, which python hashes once per lookup
+        key = (days.tobytes(), risk_free_rate, annualiser)
+        with cls._benchmark_lock:
+            navs = cls._benchmark_cache.get(key)
+            if navs is not None:
+                cls._benchmark_cache.move_to_end(key)
+                return navs
+        initial_value = 100
+        offsets = days - days.min() if len(days) else days
+        navs = initial_value * np.power(1 + risk_free_rate / annualiser, offsets)
+        navs.flags.writeable = False
+        with cls._benchmark_lock:
+            cls._benchmark_cache[key] = navs
+            while len(cls._benchmark_cache) > cls.benchmark_cache_size:
+                cls._benchmark_cache.popitem(last=False)
+        return navs
 
     @staticmethod
     def _merge(scheme_df, benchmark_df):
@@ -58,28 +237,36 @@ class RatioCalculator:
             return combo_df
         return scheme_df
 
+    def _with_columns(self, *columns):
+        """
+        a new frame of the base data followed by the given (name, values) columns in order,
+        leaving the base frame as it is.
+        """
+        computed = pd.DataFrame(collections.OrderedDict(columns), index=self.combo_nav_df.index)
+        return self.combo_nav_df.join(computed)
+
+    @cached_metric
     def get_treynor(self, period=None):
-        beta_df = self.get_beta(period)
+        beta = self.get_beta(period)["beta"]
         df = self.combo_nav_df
-        df = df.join(beta_df, how="inner", rsuffix="_beta")
-        df["treynor"] = (df["returns"] - df["returns_benchmark"]) / df["beta"]
-        return df.filter(["treynor"])
+        treynor = (df["returns"] - df["returns_benchmark"]) / beta
+        return treynor.to_frame("treynor")
 
+    @cached_metric
     def get_alpha(self, window):
-        beta_df = self.get_beta(window)
+        beta = self.get_beta(window)["beta"]
 
         df = self.combo_nav_df
 
-        df = df.join(beta_df, how="inner")
-        df["cumulative_returns"] = df["returns"].cumsum()
-        df["cumulative_returns_benchmark"] = df["returns_benchmark"].cumsum()
-        df["alpha"] = df["cumulative_returns"] - (
-            df["cumulative_returns_benchmark"]
-            + df["beta"]
-            * (df["cumulative_returns"] - df["cumulative_returns_benchmark"])
+        cumulative_returns = df["returns"].cumsum()
+        cumulative_returns_benchmark = df["returns_benchmark"].cumsum()
+        alpha = cumulative_returns - (
+            cumulative_returns_benchmark
+            + beta * (cumulative_returns - cumulative_returns_benchmark)
         )
-        return df.filter(["alpha"])
+        return alpha.to_frame("alpha")
 
+    @cached_metric
     def get_beta(self, window):
         """
         https://stackoverflow.com/questions/39501277/efficient-python-pandas-stock-beta-calculation-on-many-dataframes
@@ -87,76 +274,61 @@ class RatioCalculator:
         beta = covariance(returns, benchmark returns) / variance(benchmark returns)
         also excel cov(a, b) = b.cov(a) in pandas
         """
-        if self.beta_cache is not None:
-            return self.beta_cache
-
-        df = self.combo_nav_df.copy()
-        df["var"] = df["returns_benchmark"].rolling(window=window).var()
-        df["cov"] = df["returns_benchmark"].rolling(window=window).cov(df["returns"])
-        df["beta"] = df["cov"] / df["var"]
-        df = df.filter(["beta"])
-        self.beta_cache = df
-        return df
+        df = self.combo_nav_df
+        var = df["returns_benchmark"].rolling(window=window).var()
+        cov = df["returns_benchmark"].rolling(window=window).cov(df["returns"])
+        return (cov / var).to_frame("beta")
 
+    @cached_metric
     def get_upside_capture(self, window):
         """
         requires benchmark data
         """
-
         df = self.combo_nav_df
-        df["scheme_return_when_benchmark_up"] = df["returns"].where(
-            df["returns_benchmark"] > 0, 0
-        )
-        df["benchmark_return_when_benchmark_up"] = df["returns_benchmark"].where(
-            df["returns_benchmark"] > 0, 0
-        )
-
-        df["upside_cagr_fund"] = (1 + df["scheme_return_when_benchmark_up"]).rolling(
-            window=window
-        ).apply(np.prod, raw=True) - 1
-        df["upside_cagr_index"] = (
-            1 + df["benchmark_return_when_benchmark_up"]
-        ).rolling(window=window).apply(np.prod, raw=True) - 1
-
-        df["upside_capture_ratio"] = (1 + df["upside_cagr_fund"]) / (
-            1 + df["upside_cagr_index"]
+        benchmark_up = df["returns_benchmark"] > 0
+        scheme_return = df["returns"].where(benchmark_up, 0).values
+        benchmark_return = df["returns_benchmark"].where(benchmark_up, 0).values
+
+        upside_cagr_fund = rolling_prod(1 + scheme_return, window) - 1
+        upside_cagr_index = rolling_prod(1 + benchmark_return, window) - 1
+        return self._with_columns(
+            ("scheme_return_when_benchmark_up", scheme_return),
+            ("benchmark_return_when_benchmark_up", benchmark_return),
+            ("upside_cagr_fund", upside_cagr_fund),
+            ("upside_cagr_index", upside_cagr_index),
+            ("upside_capture_ratio", (1 + upside_cagr_fund) / (1 + upside_cagr_index)),
         )
-        return df
 
+    @cached_metric
     def get_downside_capture(self, window):
         """
         requires benchmark data
         """
         df = self.combo_nav_df
-        df["scheme_return_when_benchmark_down"] = df["returns"].where(
-            df["returns_benchmark"] < 0, 0
-        )
-        df["benchmark_return_when_benchmark_down"] = df["returns_benchmark"].where(
-            df["returns_benchmark"] < 0, 0
+        benchmark_down = df["returns_benchmark"] < 0
+        scheme_return = df["returns"].where(benchmark_down, 0).values
+        benchmark_return = df["returns_benchmark"].where(benchmark_down, 0).values
+
+        downside_cagr_fund = rolling_prod(1 + scheme_return, window) - 1
+        downside_cagr_index = rolling_prod(1 + benchmark_return, window) - 1
+        return self._with_columns(
+            ("scheme_return_when_benchmark_down", scheme_return),
+            ("benchmark_return_when_benchmark_down", benchmark_return),
+            ("downside_cagr_fund", downside_cagr_fund),
+            ("downside_cagr_index", downside_cagr_index),
+            ("downside_capture_ratio", (1 - downside_cagr_fund) / (1 - downside_cagr_index)),
         )
 
-        df["downside_cagr_fund"] = (
-            1 + df["scheme_return_when_benchmark_down"]
-        ).rolling(window=window).apply(np.prod, raw=True) - 1
-        df["downside_cagr_index"] = (
-            1 + df["benchmark_return_when_benchmark_down"]
-        ).rolling(window=window).apply(np.prod, raw=True) - 1
-
-        df["downside_capture_ratio"] = (1 - df["downside_cagr_fund"]) / (
-            1 - df["downside_cagr_index"]
-        )
-        return df
-
+    @cached_metric
     def get_drawdown(self, window):
         """
         here window means that a max would be taken for that rolling window
         :param period:
         :return:
         """
-        df = self.combo_nav_df
-
-        df["nav_peak"] = df["nav"].rolling(window=window).max()
-        df["drawdown"] = (df["nav"] / df["nav_peak"]) - 1
+        nav = self.combo_nav_df["nav"]
+        nav_peak = nav.rolling(window=window).max()
+        df = self._with_columns(("nav_peak", nav_peak), ("drawdown", (nav / nav_peak) - 1))
 
         # how to get days
         # df = df.tail(window)
@@ -170,13 +342,17 @@ class RatioCalculator:
 
         return df
 
+    @cached_metric
     def get_volatility(self, window):
-        df = self.combo_nav_df
-        df["volatility"] = df["returns"].rolling(window=window).std() * math.sqrt(
+        volatility = self.combo_nav_df["returns"].rolling(window=window).std() * math.sqrt(
             self.annualiser
         )
-        return df.filter(["volatility"])
+        return volatility.to_frame("volatility")
 
+    def annualised_rolling_mean(self, returns, window):
+        return ((1 + returns.rolling(window=window).mean()) ** self.annualiser) - 1
+
+    @cached_metric
     def get_sharpe(self, window):
         """
         https://stackoverflow.com/questions/49091044/python-rolling-sharpe-ratio-with-pandas-or-numpy
@@ -189,45 +365,128 @@ class RatioCalculator:
 
         df = self.combo_nav_df
 
-        df["returns_mean"] = (
-            (1 + df["returns"].rolling(window=window).mean()) ** self.annualiser
-        ) - 1
-        df["benchmark_returns_mean"] = (
-            (1 + df["returns_benchmark"].rolling(window=window).mean())
-            ** self.annualiser
-        ) - 1
-        df["excess_returns_std"] = (df["returns"] - df["returns_benchmark"]).rolling(
+        returns_mean = self.annualised_rolling_mean(df["returns"], window)
+        benchmark_returns_mean = self.annualised_rolling_mean(df["returns_benchmark"], window)
+        excess_returns_std = (df["returns"] - df["returns_benchmark"]).rolling(
             window=window
         ).std() * math.sqrt(self.annualiser)
-        df["sharpe"] = (df["returns_mean"] - df["benchmark_returns_mean"]) / df[
-            "excess_returns_std"
-        ]
+        sharpe = (returns_mean - benchmark_returns_mean) / excess_returns_std
 
-        return df.filter(["sharpe"])
+        return sharpe.to_frame("sharpe")
 
+    @cached_metric
     def get_sortino(self, window):
         """
         Similar to sharpe, only negative returns are considered
         """
         df = self.combo_nav_df
 
-        df["returns_mean"] = (
-            (1 + df["returns"].rolling(window=window).mean()) ** self.annualiser
-        ) - 1
-        df["benchmark_returns_mean"] = (
-            (1 + df["returns_benchmark"].rolling(window=window).mean())
-            ** self.annualiser
-        ) - 1
-        df["excess_returns"] = df["returns"] - df["returns_benchmark"]
-        df["excess_returns_downside"] = df["excess_returns"].where(
-            df["excess_returns"] < 0, 0
-        )
-        df["downside_excess_returns_std"] = df["excess_returns_downside"].rolling(
+        returns_mean = self.annualised_rolling_mean(df["returns"], window)
+        benchmark_returns_mean = self.annualised_rolling_mean(df["returns_benchmark"], window)
+        excess_returns = df["returns"] - df["returns_benchmark"]
+        excess_returns_downside = excess_returns.where(excess_returns < 0, 0)
+        downside_excess_returns_std = excess_returns_downside.rolling(
             window=window
         ).std() * math.sqrt(self.annualiser)
 
-        df["sortino"] = (df["returns_mean"] - df["benchmark_returns_mean"]) / df[
-            "downside_excess_returns_std"
+        sortino = (returns_mean - benchmark_returns_mean) / downside_excess_returns_std
+
+        return sortino.to_frame("sortino")
+
+    # metrics get_all derives from shared rolling moments, and those it takes from the
+    # metric methods, by the column they return
+    moment_metrics = ("volatility", "beta", "alpha", "treynor", "sharpe", "sortino")
+    # metrics comparing the returns to the benchmark returns
+    benchmark_metrics = (
+        "beta", "alpha", "treynor", "sharpe", "sortino", "upside_capture", "downside_capture"
+    )
+    delegated_metrics = {
+        "drawdown": ("get_drawdown", "drawdown"),
+        "upside_capture": ("get_upside_capture", "upside_capture_ratio"),
+        "downside_capture": ("get_downside_capture", "downside_capture_ratio"),
+    }
+
+    def get_all(self, window, metrics=None):
+        """
+        several metrics over one window in a single frame, one column per metric. The
+        rolling sums of the returns, the benchmark returns, their squares and products and
+        the downside excess returns are computed once and every ratio is derived from them,
+        instead of each ``get_*`` method rolling over the same series again.
+
+        :param window: int
+        :param metrics: list of metric names, by default
+            volatility, beta, alpha, treynor, sharpe and sortino. drawdown, upside_capture
+            and downside_capture may be asked for as well
+        :return: DataFrame indexed like the nav data
+        """
+        metrics = tuple(metrics) if metrics is not None else self.moment_metrics
+        unknown = [
+            m for m in metrics if m not in self.moment_metrics and m not in self.delegated_metrics
         ]
+        if unknown:
+            raise ValueError("unknown metrics {}".format(", ".join(map(str, unknown))))
+        if "returns_benchmark" not in self.combo_nav_df:
+            needs_benchmark = [m for m in metrics if m in self.benchmark_metrics]
+            if needs_benchmark:
+                raise ValueError(
+                    "{} need benchmark nav data or a risk free rate".format(
+                        ", ".join(needs_benchmark)
+                    )
+                )
+        return self._get_all(window, metrics)
+
+    @cached_metric
+    def _get_all(self, window, metrics):
+        df = self.combo_nav_df
+        columns = {}
+        if any(m in self.moment_metrics for m in metrics):
+            columns.update(self._get_moment_metrics(window, metrics))
+        for metric in metrics:
+            if metric in self.delegated_metrics:
+                method, column = self.delegated_metrics[metric]
+                columns[metric] = getattr(self, method)(window)[column].values
+        # columns given in order, pandas sorts the keys of a dict before python 3.6
+        return pd.DataFrame(columns, index=df.index, columns=list(metrics))
+
+    def _get_moment_metrics(self, window, metrics):
+        df = self.combo_nav_df
+        returns = df["returns"].values
+        annualiser_sqrt = math.sqrt(self.annualiser)
+        if set(metrics) & set(self.moment_metrics) <= {"volatility"}:
+            moments = RollingMoments(window, returns=returns)
+            return {"volatility": np.sqrt(moments.var("returns")) * annualiser_sqrt}
+
+        benchmark = df["returns_benchmark"].values
+        excess = returns - benchmark
+        # nan excess returns count as 0, like ``where(excess < 0, 0)`` in get_sortino
+        downside = np.where(excess < 0, excess, 0)
+        moments = RollingMoments(window, returns=returns, benchmark=benchmark, downside=downside)
+        columns = {"volatility": np.sqrt(moments.var("returns")) * annualiser_sqrt}
+
+        if {"beta", "alpha", "treynor"} & set(metrics):
+            beta = moments.cov("returns", "benchmark") / moments.var("benchmark")
+            columns["beta"] = beta
+            columns["treynor"] = excess / beta
+            cumulative_returns = df["returns"].cumsum().values
+            cumulative_returns_benchmark = df["returns_benchmark"].cumsum().values
+            columns["alpha"] = cumulative_returns - (
+                cumulative_returns_benchmark
+                + beta * (cumulative_returns - cumulative_returns_benchmark)
+            )
 
-        return df.filter(["sortino"])
+        if {"sharpe", "sortino"} & set(metrics):
+            excess_mean = ((1 + moments.mean("returns")) ** self.annualiser) - (
+                (1 + moments.mean("benchmark")) ** self.annualiser
+            )
+            # var(x - y) = var(x) + var(y) - 2 cov(x, y), over the rows both are there
+            both = ("returns", "benchmark")
+            excess_var = (
+                moments.var("returns", both)
+                + moments.var("benchmark", both)
+                - 2 * moments.cov("returns", "benchmark")
+            )
+            columns["sharpe"] = excess_mean / (np.sqrt(np.maximum(excess_var, 0)) * annualiser_sqrt)
+            columns["sortino"] = excess_mean / (
+                np.sqrt(moments.var("downside")) * annualiser_sqrt
+            )
+        return columns
@@ -0,0 +1,109 @@
+import collections
+
+
+class SolveStats:
+    """
+    What one xirr solve did: npv evaluations over all its attempts (``iterations``), the
+    starting rates newton was tried from (``guesses``), the bracket searched if any, the
+    ``method`` that found the rate ('closed form', 'newton', 'polynomial', 'bracketed',
+    None when nothing did), why each failed attempt failed (``failures``) and the wall
+    time in seconds (``elapsed``).
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self.guesses = []
+        self.bracket = None
+        self.method = None
+        self.failures = []
+        self.elapsed = 0.0
+
+    @property
+    def failure(self):
+        # the reason of the last failed attempt, when no attempt succeeded
+        if self.method is None and self.failures:
+            return self.failures[-1]
+        return None
+
+    def __repr__(self):
+        return (
+            "SolveStats(method={!r}, iterations={}, guesses={!r}, bracket={!r}, "
+            "failures={!r}, elapsed={:.6f})".format(
+                self.method,
+                self.iterations,
+                self.guesses,
+                self.bracket,
+                self.failures,
+                self.elapsed,
+            )
+        )
+
+
+class BatchStats:
+    """
+    Aggregate counters of batch xirr runs. Counts portfolios by status (``converged``,
+    ``fallback``, ``failed``, and ``invalid`` for those without both positive and negative
+    flows), batched newton passes, npv evaluations per portfolio summed over batched newton
+    and fallback solves (``iterations``), the method behind every rate (``methods``),
+    failure reasons of fallback attempts (``failures``) and wall time. ``fallbacks`` maps
+    the index of every portfolio that needed a fallback solve to its ``SolveStats``, which
+    is where pathological ledgers show up.
+    """
+
+    def __init__(self):
+        self.portfolios = 0
+        self.converged = 0
+        self.fallback = 0
+        self.failed = 0
+        self.invalid = 0
+        self.newton_passes = 0
+        self.iterations = 0
+        self.methods = collections.Counter()
+        self.failures = collections.Counter()
+        self.fallbacks = {}
+        self.elapsed = 0.0
+
+    def record_fallback(self, portfolio, stats):
+        self.fallbacks[portfolio] = stats
+        self.iterations += stats.iterations
+        self.methods[stats.method or "failed"] += 1
+        self.failures.update(stats.failures)
+
+    def merge(self, other, first=0, portfolios=None):
+        """
+        adds the counters of ``other``, a run over the portfolios starting at ``first``, or
+        over the given ``portfolios`` indices. The passes of runs going on side by side are
+        added up as well.
+        """
+        for name in (
+            "portfolios",
+            "converged",
+            "fallback",
+            "failed",
+            "invalid",
+            "newton_passes",
+            "iterations",
+            "elapsed",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.methods.update(other.methods)
+        self.failures.update(other.failures)
+        for portfolio, stats in other.fallbacks.items():
+            if portfolios is not None:
+                portfolio = int(portfolios[portfolio])
+            self.fallbacks[first + portfolio] = stats
+
+    def __repr__(self):
+        return (
+            "BatchStats(portfolios={}, converged={}, fallback={}, failed={}, invalid={}, "
+            "newton_passes={}, iterations={}, elapsed={:.6f})".format(
+                self.portfolios,
+                self.converged,
+                self.fallback,
+                self.failed,
+                self.invalid,
+                self.newton_passes,
+                self.iterations,
+                self.elapsed,
+            )
+        )
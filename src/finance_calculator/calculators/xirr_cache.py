@@ -0,0 +1,187 @@
+import collections
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+from finance_calculator.calculators.portfolio_calculator import XIRR, BatchXIRR
+
+
+class XIRRCache:
+    """
+    Memoizes xirr results by ledger content, so unchanged ledgers are answered without
+    solving. The key is a sha1 digest of the merged year fraction and amount arrays the
+    solver sees, plus the solver settings; changing the ledger, the day count convention,
+    the guess or the tolerances gives a different key.
+
+    Results live in an in-memory LRU of up to ``maxsize`` entries and, when ``path`` is
+    given, in an sqlite file that outlives the process. ``hits``, ``misses`` and
+    ``disk_hits`` count lookups, ``hit_rate`` is the share answered from either tier.
+    """
+
+    # part of every key: bump it when a solver change gives different results, so results
+    # stored by an older version are not served any more
+    version = 1
+    # sqlite limits the number of bound parameters of one statement
+    query_chunk = 500
+
+    def __init__(self, maxsize=100000, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS xirr (key BLOB PRIMARY KEY, rate REAL, status INTEGER)"
+            )
+            self._db.commit()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @classmethod
+    def settings(cls, **options):
+        """
+        the solver settings that change a result, with the given per call options.
+        """
+        return (
+            "xirr",
+            cls.version,
+            XIRR.eps_max_rate,
+            XIRR.eps_max_value,
+            XIRR.iter_max,
+            XIRR.bracket_iter_max,
+            XIRR.polynomial_degree_max,
+            XIRR.bracket_rates,
+        ) + tuple(sorted(options.items()))
+
+    @classmethod
+    def key(cls, year_fracs, amounts, settings):
+        digest = hashlib.sha1(repr(settings).encode())
+        digest.update(np.int64(len(amounts)).tobytes())
+        digest.update(np.ascontiguousarray(year_fracs, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(amounts, dtype=np.float64).tobytes())
+        return digest.digest()
+
+    def get_many(self, keys):
+        """
+        :param keys: list of keys
+        :return: (rates, status, found) arrays, nan and ``BatchXIRR.FAILED`` where not found
+        """
+        rates = np.full(len(keys), np.nan)
+        status = np.full(len(keys), BatchXIRR.FAILED)
+        found = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    rates[i], status[i] = self.memory[key]
+                    found[i] = True
+            if self._db is not None and not found.all():
+                rows = {}
+                missing = [keys[i] for i in np.flatnonzero(~found)]
+                for first in range(0, len(missing), self.query_chunk):
+                    chunk = missing[first:first + self.query_chunk]
+                    rows.update(
+                        (key, (rate, int(code)))
+                        for key, rate, code in self._db.execute(
+                            "SELECT key, rate, status FROM xirr WHERE key IN ({})".format(
+                                ",".join("?" * len(chunk))
+                            ),
+                            chunk,
+                        )
+                    )
+                for i in np.flatnonzero(~found):
+                    if keys[i] in rows:
+                        rate, status[i] = rows[keys[i]]
+                        rates[i] = np.nan if rate is None else rate
+                        found[i] = True
+                        self.disk_hits += 1
+                        self._remember(keys[i], float(rates[i]), int(status[i]))
+            self.hits += int(found.sum())
+            self.misses += int(len(keys) - found.sum())
+        return rates, status, found
+
+    def put_many(self, keys, rates, status):
+        with self._lock:
+            for key, rate, code in zip(keys, rates, status):
+                self._remember(key, float(rate), int(code))
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO xirr VALUES (?, ?, ?)",
+                    (
+                        (key, float(rate) if np.isfinite(rate) else None, int(code))
+                        for key, rate, code in zip(keys, rates, status)
+                    ),
+                )
+                self._db.commit()
+
+    def _remember(self, key, rate, status):
+        self.memory[key] = (rate, status)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def get_xirr(self, xirr, solve=None, **options):
+        """
+        xirr in percent of a ``XIRR`` instance, solved with ``solve()`` (``xirr.get_xirr``
+        by default) on a miss. A guess set on the instance is part of the key; without one
+        the key is the one ``get_xirr_batch`` builds for the same ledger and options.
+        """
+        if xirr.guess is not None:
+            options["guess"] = xirr.guess
+        key = self.key(xirr.year_fracs, xirr.amounts, self.settings(**options))
+        rates, _, found = self.get_many([key])
+        if found[0]:
+            if xirr.stats is not None:
+                xirr.stats.method = "cache"
+            return float(rates[0]) if np.isfinite(rates[0]) else None
+        result = solve() if solve is not None else xirr.get_xirr()
+        failed = result is None
+        self.put_many(
+            [key],
+            [np.nan if failed else result],
+            [BatchXIRR.FAILED if failed else BatchXIRR.CONVERGED],
+        )
+        return result
+
+    def get_xirr_batch(self, batch, solve, **options):
+        """
+        (rates, status) of a ``BatchXIRR`` like ``batch.get_xirr``, where only the
+        portfolios missing from the cache are handed to ``solve`` as a smaller batch, along
+        with their indices in ``batch``.
+        """
+        settings = self.settings(**options)
+        offsets = batch.offsets
+        keys = [
+            self.key(batch.year_fracs[start:end], batch.amounts[start:end], settings)
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+        rates, status, found = self.get_many(keys)
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            solved_rates, solved_status = solve(batch.take(missing), missing)
+            rates[missing], status[missing] = solved_rates, solved_status
+            self.put_many([keys[i] for i in missing], solved_rates, solved_status)
+        return rates, status
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            self.hits = self.misses = self.disk_hits = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM xirr")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
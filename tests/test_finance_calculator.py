@@ -8,8 +8,89 @@ def test_ratio_calculator():
     dwd = rc.get_alpha(365*3)
 
 
+def test_ratio_calculator_caches_metrics_per_window():
+    rc = fc.get_ratio_calculator(scheme_data, benchmark_data, cache_size=3)
+    short, long = rc.get_beta(250), rc.get_beta(750)
+    assert not short["beta"].equals(long["beta"])
+    assert rc.get_beta(window=250).equals(short)
+    assert (rc.cache_hits, rc.cache_misses) == (1, 2)
+    rc.get_upside_capture(250), rc.get_upside_capture(750)
+    assert rc.cache_misses == 4
+    # the capture ratios pushed the least recently used 750 day beta out of the cache
+    rc.get_beta(250)
+    assert (rc.cache_hits, rc.cache_misses) == (2, 4)
+    assert rc.get_beta(750).equals(long) and rc.cache_misses == 5
+
+
+def test_ratio_calculator_cached_metrics_are_not_changed_by_callers():
+    rc = fc.get_ratio_calculator(scheme_data, benchmark_data)
+    fresh = fc.get_ratio_calculator(scheme_data, benchmark_data)
+    beta = rc.get_beta(250)
+    beta["beta"] = 0
+    assert rc.get_beta(250).equals(fresh.get_beta(250))
+    # treynor reads the cached beta
+    assert rc.get_treynor(250).equals(fresh.get_treynor(250))
+
+
+def test_ratio_calculator_does_not_grow_the_base_frame():
+    rc = fc.get_ratio_calculator(scheme_data, benchmark_data)
+    columns = list(rc.combo_nav_df.columns)
+    for metric in ("alpha", "treynor", "upside_capture", "downside_capture", "drawdown",
+                   "volatility", "sharpe", "sortino"):
+        getattr(rc, "get_" + metric)(250)
+    assert list(rc.combo_nav_df.columns) == columns
+    # the frames of these metrics carry the base data along, as they always did
+    assert list(rc.get_drawdown(250).columns) == columns + ["nav_peak", "drawdown"]
+    for metric in ("upside_capture", "downside_capture"):
+        frame = getattr(rc, "get_" + metric)(250)
+        assert list(frame.columns[:len(columns)]) == columns and metric + "_ratio" in frame
+
+
+def test_get_all_matches_the_metric_methods():
+    import numpy as np
+    import pytest
+
+    rc = fc.get_ratio_calculator(scheme_data, benchmark_data, cache_size=0)
+    metrics = ["volatility", "beta", "alpha", "treynor", "sharpe", "sortino", "drawdown"]
+    ratios = rc.get_all(250, metrics)
+    assert list(ratios.columns) == metrics
+    for metric in metrics:
+        expected = getattr(rc, "get_" + metric)(250)[metric].values
+        assert np.allclose(ratios[metric].values, expected, rtol=1e-8, equal_nan=True)
+    with pytest.raises(ValueError):
+        rc.get_all(250, ["beta", "omega"])
+
+
+def test_get_all_without_benchmark():
+    import pytest
+
+    rc = fc.get_ratio_calculator(scheme_data)
+    ratios = rc.get_all(250, ["volatility", "drawdown"])
+    assert list(ratios.columns) == ["volatility", "drawdown"]
+    with pytest.raises(ValueError):
+        rc.get_all(250, ["volatility", "sharpe"])
+
+
 def test_benchmark_nav_created_from_risk_free_rate():
     rc = fc.get_ratio_calculator(scheme_data, risk_free_rate=0.05)
+    navs = rc.combo_nav_df["nav_benchmark"]
+    first = navs.index.min()
+    for day in [navs.index[0], navs.index[1000], navs.index[-1]]:
+        assert abs(navs[day] / (100 * (1 + 0.05 / 250) ** (day - first).days) - 1) < 1e-12
+    # the curve is shared by calculators over the same dates
+    other = fc.get_ratio_calculator(scheme_data, risk_free_rate=0.05)
+    assert other.get_risk_free_navs(navs.index, 0.05, 250) is rc.get_risk_free_navs(
+        navs.index, 0.05, 250
+    )
+
+
+def test_nav_dataframe_is_not_changed():
+    import pandas as pd
+
+    df = pd.DataFrame(scheme_data, columns=["date", "nav"])
+    columns = list(df.columns)
+    fc.get_drawdown(df)
+    assert list(df.columns) == columns
 
 
 def test_drawdown():
@@ -48,6 +129,21 @@ def test_downside_capture():
     assert type(down_capture) is float
 
 
+def test_rolling_prod_matches_pandas():
+    import numpy as np
+    import pandas as pd
+    from src.finance_calculator.calculators.ratio_calculator import rolling_prod
+
+    values = 1 + np.random.default_rng(0).normal(0, 0.01, 2000)
+    values[[100, 900]] = 0
+    values[[300, 301, 1500]] = -0.5
+    values[1200] = np.nan
+    for window in (1, 7, 750):
+        expected = pd.Series(values).rolling(window).apply(np.prod, raw=True).values
+        assert np.allclose(rolling_prod(values, window), expected, rtol=1e-12, equal_nan=True)
+    assert np.isnan(rolling_prod(values[:3], 5)).all()
+
+
 def test_beta():
     beta = fc.get_beta(scheme_data, benchmark_data)
     assert beta is not None
@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from finance_calculator import api as fc
+
+cashflow_data = [
+    (datetime.date(2020, 1, 1), 1000),
+    (datetime.date(2020, 2, 1), 500),
+    (datetime.date(2020, 3, 1), -300),
+]
+
+# portfolio value at the close of each date, after that day's cashflow
+valuation_data = [
+    (datetime.date(2020, 1, 1), 1000),
+    (datetime.date(2020, 1, 15), 1100),
+    (datetime.date(2020, 2, 1), 1600),
+    (datetime.date(2020, 2, 15), 1440),
+    (datetime.date(2020, 3, 1), 1140),
+    (datetime.date(2020, 3, 15), 1254),
+]
+
+
+def test_twrr_chains_sub_period_returns():
+    twrr = fc.get_twrr(cashflow_data, valuation_data)
+    expected = (1.1 * (1100 / 1100) * 0.9 * (1440 / 1440) * 1.1 - 1) * 100
+    assert abs(twrr - expected) < 1e-9
+
+    series = fc.get_twrr(cashflow_data, valuation_data, tail=False)
+    assert len(series) == len(valuation_data)
+    assert series.iloc[0] == 0
+    assert abs(series.iloc[1] - 10) < 1e-9
+
+
+def test_twrr_grouped():
+    cashflow_df = pd.DataFrame(
+        [("a", day, amount) for day, amount in cashflow_data]
+        + [("b", datetime.date(2020, 1, 1), 100)],
+        columns=["folio_id", "date", "amount"],
+    )
+    valuation_df = pd.DataFrame(
+        [("a", day, value) for day, value in valuation_data]
+        + [("b", datetime.date(2020, 1, 1), 100), ("b", datetime.date(2020, 6, 1), 80)],
+        columns=["folio_id", "date", "value"],
+    )
+    result = fc.get_twrr_grouped(cashflow_df, valuation_df)
+    assert abs(result["a"] - fc.get_twrr(cashflow_data, valuation_data)) < 1e-9
+    assert abs(result["b"] + 20) < 1e-9
+    assert not np.isnan(result).any()
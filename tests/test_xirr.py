@@ -1,6 +1,9 @@
 import datetime
 
+import numpy as np
+
 from finance_calculator import api as fc
+from finance_calculator.calculators.portfolio_calculator import XIRR, BatchXIRR
 
 cashflow_data = [
     (datetime.date(2020, 3, 1), 10000),
@@ -21,3 +24,496 @@ cashflow_data = [
 def test_xirr_crude():
     xirr = fc.get_xirr(cashflow_data)
     assert type(xirr) is float
+
+
+def test_xirr_vectorized_npv_matches_scalar_loop():
+    xirr = XIRR(list(cashflow_data))
+    first = xirr.transactions[0][0]
+    for rate in [-0.5, -0.1, 0.0, 0.1, 0.45]:
+        npv = sum(
+            amount / pow(1 + rate, (day - first).days / 365)
+            for day, amount in xirr.transactions
+        )
+        deriv = sum(
+            -((day - first).days / 365) * amount / pow(1 + rate, (day - first).days / 365 + 1)
+            for day, amount in xirr.transactions
+        )
+        result_value, result_deriv = xirr.irr_result_and_deriv(rate)
+        assert abs(result_value - npv) < 1e-6
+        assert abs(result_deriv - deriv) < 1e-6
+        assert abs(xirr.irr_result(rate) - npv) < 1e-6
+        assert abs(xirr.irr_result_deriv(rate) - deriv) < 1e-6
+
+
+def test_xirr_many_matches_single_solves():
+    lumpsum = [
+        (datetime.date(2019, 1, 15), 50000),
+        (datetime.date(2021, 6, 30), -71000),
+    ]
+    cashflow_sets = [list(cashflow_data), lumpsum, [], [(datetime.date(2020, 1, 1), 100)]]
+    rates, status = fc.get_xirr_many(cashflow_sets)
+    assert len(rates) == len(status) == 4
+    assert abs(rates[0] - fc.get_xirr(list(cashflow_data))) < 1e-6
+    assert abs(rates[1] - fc.get_xirr(list(lumpsum))) < 1e-6
+    assert list(status) == [
+        BatchXIRR.CONVERGED,
+        BatchXIRR.CONVERGED,
+        BatchXIRR.FAILED,
+        BatchXIRR.FAILED,
+    ]
+    assert np.isnan(rates[2]) and np.isnan(rates[3])
+
+
+def test_xirr_failed_solves_do_not_affect_later_calls():
+    # no xirr exists for these flows, so every fallback gets exercised
+    no_root = [
+        (datetime.date(2020, 1, 1), 100),
+        (datetime.date(2020, 6, 1), -10),
+        (datetime.date(2021, 1, 1), 100),
+    ]
+    for _ in range(3):
+        assert fc.get_xirr(list(no_root)) is None
+    assert type(fc.get_xirr(list(cashflow_data))) is float
+
+
+def test_xirr_thread_pool_is_deterministic():
+    from concurrent.futures import ThreadPoolExecutor
+
+    expected = fc.get_xirr(list(cashflow_data))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: fc.get_xirr(list(cashflow_data)), range(64)))
+    assert results == [expected] * 64
+
+
+def test_xirr_bracketed_method_when_newton_diverges():
+    # newton from the default guess runs off to a rate below -100% for this ledger
+    cashflows = [
+        (datetime.date(2010, 1, 1), 1000),
+        (datetime.date(2010, 1, 2), -100),
+        (datetime.date(2030, 1, 1), -1),
+    ]
+    xirr = XIRR(list(cashflows))
+    assert XIRR.newtons_method(xirr.year_fracs, xirr.amounts, -0.1) is None
+    result = xirr.get_xirr()
+    assert result is not None
+    assert abs(xirr.irr_result(result / 100)) < XIRR.eps_max_value * 10
+
+    low, high, low_value = XIRR.bracket(xirr.year_fracs, xirr.amounts, -0.1)
+    assert low < result / 100 < high
+
+
+def test_xirr_restarts_newton_before_bracketing():
+    # two roots between neighbouring bracket rates: the npv is positive at -75% and -50%,
+    # newton from the default guess fails and a restart finds the -68.9% root
+    cashflows = [
+        (datetime.date(2015, 4, 6), 95965.04),
+        (datetime.date(2017, 9, 24), -7129.1),
+        (datetime.date(2018, 3, 2), -235.4),
+        (datetime.date(2019, 6, 21), -8633.64),
+        (datetime.date(2020, 2, 26), 4007.31),
+    ]
+    xirr = XIRR(list(cashflows))
+    assert XIRR.newtons_method(xirr.year_fracs, xirr.amounts, -0.1) is None
+    assert abs(fc.get_xirr(list(cashflows)) - -68.897) < 1e-3
+    rates, _ = fc.get_xirr_many([list(cashflows)])
+    assert abs(rates[0] - -68.897) < 1e-3
+
+
+def test_incremental_xirr_matches_cold_solve():
+    ledger = fc.get_incremental_xirr(list(cashflow_data[:3]))
+    assert ledger.xirr is None
+    for day, amount in cashflow_data[3:]:
+        ledger.append(day, amount)
+    assert abs(ledger.xirr - fc.get_xirr(list(cashflow_data))) < 1e-6
+
+    late_installment = (datetime.date(2020, 4, 15), 5000)
+    early_installment = (datetime.date(2020, 2, 1), 5000)
+    ledger.append(*late_installment)
+    ledger.append(*early_installment)
+    expected = fc.get_xirr(list(cashflow_data) + [late_installment, early_installment])
+    assert abs(ledger.xirr - expected) < 1e-6
+    assert list(ledger.year_fracs) == sorted(ledger.year_fracs)
+
+
+def test_incremental_xirr_does_not_keep_a_spurious_root():
+    # flows changing sign more than once can have several roots: newton warm started from
+    # the closed form rate of the first two flows stays on a rate far above the one a
+    # cold solve finds (7.15% and -87.8% here)
+    ledgers = [
+        [
+            (datetime.date(2015, 1, 1), -5304),
+            (datetime.date(2015, 1, 31), 10000),
+            (datetime.date(2015, 3, 2), 10000),
+            (datetime.date(2015, 4, 1), -14776),
+        ],
+        [
+            (datetime.date(2015, 6, 10), 835),
+            (datetime.date(2015, 6, 19), -5508),
+            (datetime.date(2015, 12, 6), -901),
+            (datetime.date(2016, 1, 12), 2159),
+        ],
+    ]
+    for cashflows, rate in zip(ledgers, [7.15, -87.79]):
+        expected = fc.get_xirr(list(cashflows))
+        assert abs(expected - rate) < 1e-2
+        for order in (cashflows, cashflows[::-1]):
+            ledger = fc.get_incremental_xirr([])
+            for day, amount in order:
+                ledger.append(day, amount)
+            assert abs(ledger.xirr - expected) < 1e-6
+
+
+def test_xirr_from_dataframe_and_arrays():
+    import pandas as pd
+
+    expected = fc.get_xirr(list(cashflow_data))
+    df = pd.DataFrame(cashflow_data, columns=["date", "amount"])
+    assert abs(fc.get_xirr(df) - expected) < 1e-9
+    assert abs(fc.get_xirr(df.set_index(pd.to_datetime(df["date"])).filter(["amount"])) - expected) < 1e-9
+
+    dates = np.array([day for day, _ in cashflow_data], dtype="datetime64[D]")
+    amounts = np.array([amount for _, amount in cashflow_data])
+    # order of the arrays does not matter
+    assert abs(fc.get_xirr((dates[::-1], amounts[::-1])) - expected) < 1e-9
+
+
+def test_xirr_grouped_matches_per_group_solves():
+    import pandas as pd
+
+    lumpsum = [
+        (datetime.date(2019, 1, 15), 50000),
+        (datetime.date(2021, 6, 30), -71000),
+    ]
+    rows = [("b", day, amount) for day, amount in cashflow_data]
+    rows += [("a", day, amount) for day, amount in lumpsum]
+    rows += [("c", datetime.date(2020, 1, 1), 100)]
+    df = pd.DataFrame(rows[::-1], columns=["folio_id", "date", "amount"])
+
+    result = fc.get_xirr_grouped(df, by="folio_id")
+    assert list(result.index) == ["a", "b", "c"]
+    assert abs(result["a"] - fc.get_xirr(list(lumpsum))) < 1e-6
+    assert abs(result["b"] - fc.get_xirr(list(cashflow_data))) < 1e-6
+    assert np.isnan(result["c"])
+
+
+def test_xirr_many_parallel_matches_serial():
+    from concurrent.futures import ThreadPoolExecutor
+
+    lumpsum = [
+        (datetime.date(2019, 1, 15), 50000),
+        (datetime.date(2021, 6, 30), -71000),
+    ]
+    cashflow_sets = [list(cashflow_data), lumpsum, [(datetime.date(2020, 1, 1), 100)]] * 5
+    rates, status = fc.get_xirr_many(cashflow_sets)
+
+    parallel_rates, parallel_status = fc.get_xirr_many(cashflow_sets, n_jobs=2)
+    np.testing.assert_array_equal(parallel_rates, rates)
+    np.testing.assert_array_equal(parallel_status, status)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pooled_rates, _ = fc.get_xirr_many(cashflow_sets, executor=executor)
+    np.testing.assert_array_equal(pooled_rates, rates)
+
+
+def test_xirr_many_parallel_without_shared_memory(monkeypatch):
+    # python < 3.8 has no multiprocessing.shared_memory, the shards are sent to the workers
+    from finance_calculator.calculators import portfolio_calculator
+
+    monkeypatch.setattr(portfolio_calculator, "shared_memory", None)
+    cashflow_sets = [list(cashflow_data), [(datetime.date(2020, 1, 1), 100)]] * 5
+    rates, status = fc.get_xirr_many(cashflow_sets)
+    parallel_rates, parallel_status = fc.get_xirr_many(cashflow_sets, n_jobs=2)
+    np.testing.assert_array_equal(parallel_rates, rates)
+    np.testing.assert_array_equal(parallel_status, status)
+
+
+def test_xirr_merges_same_day_cashflows():
+    same_day = list(cashflow_data) + [
+        (datetime.date(2020, 4, 1), 2500),
+        (datetime.date(2020, 4, 1), -2500),
+        (datetime.date(2020, 6, 1), 1000),
+    ]
+    xirr = XIRR(list(same_day))
+    assert len(xirr.amounts) == len(cashflow_data)
+    assert xirr.amounts[3] == 11000
+
+    expected = xirr.get_xirr()
+    rates, _ = fc.get_xirr_many([list(same_day)])
+    assert abs(rates[0] - expected) < 1e-9
+    ledger = fc.get_incremental_xirr(list(cashflow_data))
+    for day, amount in same_day[len(cashflow_data):]:
+        ledger.append(day, amount)
+    assert ledger.size == len(cashflow_data)
+    assert abs(ledger.xirr - expected) < 1e-9
+
+
+def test_cashflows_container():
+    unsorted = list(cashflow_data[::-1])
+    ledger = fc.get_cashflows(unsorted)
+    assert unsorted == cashflow_data[::-1]
+    assert ledger.days.dtype == np.int32
+    assert ledger.amounts.dtype == np.float64
+    assert not ledger.presorted
+    ordered = ledger.sorted()
+    assert ordered.presorted and ordered.sorted() is ordered
+    assert not hasattr(ledger, "__dict__")
+
+    expected = fc.get_xirr(list(cashflow_data))
+    assert abs(fc.get_xirr(ledger) - expected) < 1e-9
+    rates, _ = fc.get_xirr_many([ledger, list(cashflow_data)])
+    assert abs(rates[0] - expected) < 1e-9 and abs(rates[1] - expected) < 1e-9
+
+    # the caller's list is no longer sorted in place
+    fc.get_xirr(unsorted)
+    assert unsorted == cashflow_data[::-1]
+
+
+def test_rolling_xirr_matches_cold_solves():
+    import pandas as pd
+    from tests.test_nav_data import scheme_data
+
+    sip = [(datetime.date(2005, 1, 3) + datetime.timedelta(days=30 * i), 1000) for i in range(24)]
+    result = fc.get_rolling_xirr(sip, scheme_data[:1500])
+    navs = pd.Series(
+        [nav for _, nav in scheme_data[:1500]],
+        index=pd.to_datetime([day for day, _ in scheme_data[:1500]]),
+    )
+    assert result.index[0] == pd.Timestamp(sip[0][0])
+    assert result.index[-1] == navs.index[-1]
+    for asof in [result.index[40], result.index[400], result.index[-1]]:
+        flows = [(day, amount) for day, amount in sip if pd.Timestamp(day) <= asof]
+        units = sum(amount / navs.asof(pd.Timestamp(day)) for day, amount in flows)
+        expected = fc.get_xirr(flows + [(asof.date(), -units * navs[asof])])
+        assert abs(result[asof] - expected) < 1e-6
+
+
+def test_modified_dietz_and_dietz_guess():
+    from finance_calculator.calculators.solver_stats import SolveStats
+
+    expected = fc.get_xirr(list(cashflow_data))
+    dietz = fc.get_modified_dietz(list(cashflow_data))
+    # gain of 10000 on an average capital of 10000 * (153 + 122 + 92 + 61 + 31) / 153
+    period_return = 10000 / (10000 * (153 + 122 + 92 + 61 + 31) / 153)
+    assert abs(dietz - ((1 + period_return) ** (365 / 153) - 1) * 100) < 1e-9
+    assert abs(dietz - expected) < 0.2 * abs(expected)
+
+    lumpsum = [
+        (datetime.date(2019, 1, 15), 50000),
+        (datetime.date(2021, 6, 30), -71000),
+    ]
+    many = fc.get_modified_dietz_many([list(cashflow_data), lumpsum, []])
+    assert abs(many[0] - dietz) < 1e-9
+    # for a single investment modified dietz is exact
+    assert abs(many[1] - fc.get_xirr(list(lumpsum))) < 1e-6
+    assert np.isnan(many[2])
+    # investments negative and proceeds positive, as in Excel, give the same returns
+    mirrored = [(day, -amount) for day, amount in lumpsum]
+    assert abs(fc.get_modified_dietz(mirrored) - many[1]) < 1e-9
+    mirrored = [(day, -amount) for day, amount in cashflow_data]
+    assert abs(fc.get_modified_dietz(mirrored) - dietz) < 1e-9
+    stats = SolveStats()
+    fc.get_xirr(list(mirrored), dietz_guess=True, stats=stats)
+    assert abs(stats.guesses[0] * 100 - dietz) < 1e-9
+
+    assert abs(fc.get_xirr(list(cashflow_data), dietz_guess=True) - expected) < 1e-6
+    rates, _ = fc.get_xirr_many([list(cashflow_data), lumpsum], dietz_guess=True)
+    assert abs(rates[0] - expected) < 1e-6
+
+
+def test_xnpv_over_rate_grid():
+    # the example of the old commented out xnpv, matching Excel
+    cashflows = [
+        (datetime.date(2010, 12, 29), -10000),
+        (datetime.date(2012, 1, 25), 20),
+        (datetime.date(2012, 3, 8), 10100),
+    ]
+    assert abs(fc.get_xnpv(cashflows, 0.1) + 966.4345) < 1e-3
+
+    rates = np.linspace(-0.5, 0.5, 11)
+    grid = fc.get_xnpv(cashflows, rates)
+    assert grid.shape == rates.shape
+    for rate, value in zip(rates, grid):
+        assert abs(value - fc.get_xnpv(cashflows, rate)) < 1e-9
+    assert fc.get_xnpv(cashflows, -1) == float("inf")
+
+    xirr = fc.get_xirr(list(cashflows))
+    assert abs(fc.get_xnpv(cashflows, xirr / 100)) < 1e-3
+
+
+def test_day_count_conventions():
+    from finance_calculator.calculators.day_count import year_fractions
+
+    dates = np.array(["2020-01-31", "2020-03-31", "2021-01-31"], dtype="datetime64[D]")
+    start = np.datetime64("2019-12-31")
+    assert np.allclose(year_fractions(dates, start, "act/360"), [31 / 360, 91 / 360, 397 / 360])
+    assert np.allclose(year_fractions(dates, start, "30/360"), [30 / 360, 90 / 360, 390 / 360])
+    # one day of 2019 and the whole of leap year 2020
+    assert np.allclose(year_fractions(dates[2:], start, "act/act"), [1 / 365 + 1 + 30 / 365])
+    assert np.allclose(year_fractions(dates, start, "ACT/365"), year_fractions(dates, start))
+
+    # a year of 360 actual days earns exactly 10% under act/360
+    start = datetime.date(2020, 1, 1)
+    lumpsum = [(start, 100), (start + datetime.timedelta(days=360), -110)]
+    assert abs(fc.get_xirr(list(lumpsum), day_count="act/360") - 10) < 1e-6
+    assert abs(fc.get_xnpv(lumpsum, 0.1, day_count="act/360")) < 1e-9
+    rates, _ = fc.get_xirr_many([list(lumpsum), list(cashflow_data)], day_count="act/360")
+    assert abs(rates[0] - 10) < 1e-6
+    assert abs(rates[1] - fc.get_xirr(list(cashflow_data), day_count="act/360")) < 1e-6
+
+    ledger = fc.get_incremental_xirr(lumpsum[:1], day_count="30/360")
+    ledger.append(datetime.date(2021, 1, 1), -110)
+    assert abs(ledger.xirr - 10) < 1e-6
+
+    # 30/360 US has end of february rules bond basis does not, it is not an alias
+    for unknown in ("bus/252", "30/360 US"):
+        try:
+            fc.get_xirr(list(lumpsum), day_count=unknown)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_xirr_closed_form_and_polynomial_paths():
+    # two flows: 100 growing to 121 over two years is 10% a year
+    start = datetime.date(2020, 1, 1)
+    lumpsum = [(start, 100), (start + datetime.timedelta(days=730), -121)]
+    assert abs(fc.get_xirr(list(lumpsum)) - 10) < 1e-9
+    rates, status = fc.get_xirr_many([list(lumpsum), list(cashflow_data)])
+    assert abs(rates[0] - 10) < 1e-9 and status[0] == BatchXIRR.CONVERGED
+    assert abs(rates[1] - fc.get_xirr(list(cashflow_data))) < 1e-6
+
+    # monthly flows under 30/360 are a polynomial in the monthly discount factor; newton
+    # fails from every starting rate on this ledger
+    months = [0, 1, 4]
+    amounts = [-119, 40, 6]
+    cashflows = [(datetime.date(2020, 1 + m, 1), a) for m, a in zip(months, amounts)]
+    xirr = XIRR(list(cashflows), day_count="30/360")
+    guess = XIRR.default_guess(xirr.amounts)
+    for start in XIRR.guesses(xirr.amounts):
+        assert XIRR.newtons_method(xirr.year_fracs, xirr.amounts, start) is None
+    result = xirr.get_xirr()
+    assert result == XIRR.polynomial_rate(xirr.year_fracs, xirr.amounts, guess)
+    assert abs(xirr.irr_result(result / 100)) < XIRR.eps_max_value
+    # off the grid there is no polynomial
+    assert XIRR.polynomial_rate(XIRR(list(cashflows)).year_fracs, xirr.amounts, guess) is None
+
+
+def test_xirr_cache(tmp_path):
+    path = str(tmp_path / "xirr.sqlite")
+    cache = fc.get_xirr_cache(maxsize=2, path=path)
+    expected = fc.get_xirr(list(cashflow_data))
+    assert abs(fc.get_xirr(list(cashflow_data), cache=cache) - expected) < 1e-9
+    assert fc.get_xirr(list(cashflow_data), cache=cache) == fc.get_xirr(
+        list(cashflow_data), cache=cache
+    )
+    assert (cache.hits, cache.misses) == (2, 1)
+    # a different day count is a different ledger to the solver
+    fc.get_xirr(list(cashflow_data), day_count="act/360", cache=cache)
+    assert cache.misses == 2
+
+    sets = [list(cashflow_data), list(cashflow_data[:3]), list(cashflow_data[1:])]
+    rates, status = fc.get_xirr_many(sets)
+    cached_rates, cached_status = fc.get_xirr_many(sets, cache=cache)
+    assert np.allclose(rates, cached_rates, equal_nan=True)
+    assert list(status) == list(cached_status)
+    cache.close()
+
+    # a new process only has the disk tier
+    cache = fc.get_xirr_cache(path=path)
+    cached_rates, cached_status = fc.get_xirr_many(sets, cache=cache)
+    assert np.allclose(rates, cached_rates, equal_nan=True)
+    assert list(status) == list(cached_status)
+    assert cache.hits == cache.disk_hits == 3 and cache.hit_rate == 1
+    cache.close()
+
+
+def test_xirr_cache_is_shared_by_single_and_batch_solves():
+    cache = fc.get_xirr_cache()
+    single = fc.get_xirr(list(cashflow_data), cache=cache)
+    rates, _ = fc.get_xirr_many([list(cashflow_data)], cache=cache)
+    assert (cache.hits, len(cache.memory)) == (1, 1)
+    assert rates[0] == single
+    fc.get_xirr(list(cashflow_data), dietz_guess=True, cache=cache)
+    fc.get_xirr_many([list(cashflow_data)], dietz_guess=True, cache=cache)
+    assert (cache.hits, len(cache.memory)) == (2, 2)
+
+
+def test_solver_stats():
+    from finance_calculator.calculators.solver_stats import BatchStats, SolveStats
+
+    stats = SolveStats()
+    fc.get_xirr(list(cashflow_data), stats=stats)
+    assert stats.method == "newton" and stats.failure is None
+    assert stats.guesses == [0.1] and stats.iterations > 0 and stats.elapsed > 0
+
+    # newton overflows from every starting rate, the bracket finds the rate
+    start = datetime.date(2010, 1, 1)
+    diverging = [
+        (start, -337),
+        (start + datetime.timedelta(days=1647), -868),
+        (start + datetime.timedelta(days=6415), 2),
+    ]
+    stats = SolveStats()
+    assert fc.get_xirr(list(diverging), stats=stats) is not None
+    assert stats.method == "bracketed" and stats.bracket is not None
+    assert len(stats.guesses) == len(XIRR.guess_vals_neg)
+    assert set(stats.failures) == {"OverflowError: discount factor out of range"}
+
+    stats = SolveStats()
+    assert fc.get_xirr([(datetime.date(2020, 1, 1), 100)], stats=stats) is None
+    assert stats.failure == "no positive and negative flows"
+
+    sets = [list(cashflow_data), list(diverging), [cashflow_data[0], cashflow_data[-1]], []]
+    stats = BatchStats()
+    fc.get_xirr_many(sets, stats=stats)
+    assert (stats.portfolios, stats.converged, stats.fallback, stats.failed) == (4, 2, 1, 1)
+    assert stats.invalid == 1 and stats.methods["closed form"] == 1
+    assert list(stats.fallbacks) == [1] and stats.fallbacks[1].method == "bracketed"
+    assert stats.iterations >= stats.newton_passes > 0
+
+    # only the ledgers missing from the cache are solved, at their positions in the call
+    cache = fc.get_xirr_cache()
+    fc.get_xirr_many(sets[:1], cache=cache)
+    stats = BatchStats()
+    fc.get_xirr_many(sets, cache=cache, stats=stats)
+    assert stats.portfolios == 3 and list(stats.fallbacks) == [1]
+
+
+def test_streamed_cashflows(tmp_path):
+    rows = list(cashflow_data) + [(datetime.date(2020, 4, 1), 2500)] * 7
+    expected = fc.get_xirr(list(rows))
+
+    ledger = fc.get_streamed_cashflows(iter(rows), chunk_size=3)
+    assert len(ledger) == len(cashflow_data)
+    assert abs(fc.get_xirr(ledger) - expected) < 1e-9
+    assert abs(fc.get_xirr(row for row in rows) - expected) < 1e-9
+
+    path = tmp_path / "ledger.csv"
+    path.write_text(
+        "folio,date,amount\n" + "".join("x,{},{}\n".format(d, a) for d, a in rows)
+    )
+    for source in (str(path), path):
+        ledger = fc.get_streamed_cashflows(source, chunk_size=4)
+        assert abs(fc.get_xirr(ledger) - expected) < 1e-9
+
+
+def test_rolling_sip_returns_match_cold_solves():
+    import pandas as pd
+    from tests.test_nav_data import scheme_data
+
+    result = fc.get_rolling_sip_returns(scheme_data[:1500], 1000, "monthly", tenure=1)
+    navs = pd.Series(
+        [nav for _, nav in scheme_data[:1500]],
+        index=pd.to_datetime([day for day, _ in scheme_data[:1500]]),
+    )
+    assert result.index[0] == navs.index[0]
+    assert result.index[-1] + pd.DateOffset(months=12) <= navs.index[-1]
+    for start in [result.index[0], result.index[300], result.index[-1]]:
+        dates = [start + pd.DateOffset(months=i) for i in range(13)]
+        units = sum(1000 / navs.asof(day) for day in dates[:-1])
+        flows = [(day.date(), 1000) for day in dates[:-1]]
+        expected = fc.get_xirr(flows + [(dates[-1].date(), -units * navs.asof(dates[-1]))])
+        assert abs(result[start] - expected) < 1e-6
+
+    weekly = fc.get_rolling_sip_returns(scheme_data[:400], 100, "weekly", tenure=0.5)
+    assert len(weekly) and weekly.notna().all()